@@ -15,6 +15,8 @@ from typing import List, Dict, Optional
 from pathlib import Path
 from collections import defaultdict
 
+from kpi_patch import SIDECAR_FILE, merge_sidecar
+
 # Import formatter functions for description and hotlist
 try:
     from live_alert_formatter import _get_hot_list_status, _get_spicy_intro, _build_confirmation_lines, _build_glydo_line
@@ -216,6 +218,12 @@ def get_cached_kpi_data() -> Dict:
         # #endregion
         
         _kpi_data_cache = load_json_file(KPI_LOGS_FILE, {"alerts": [], "true_positives": [], "false_positives": []})
+        # Fixes recorded with fix_all.py --sidecar stay pending next to the file until
+        # kpi_patch.py folds them in; serve them already (the 30s TTL picks up new ones)
+        try:
+            merge_sidecar(_kpi_data_cache, KPI_LOGS_FILE.with_name(SIDECAR_FILE.name))
+        except Exception as e:
+            print(f"⚠️ Could not merge {SIDECAR_FILE.name}: {e}")
         _cache_timestamp = now
         try:
             _cache_file_mtime = KPI_LOGS_FILE.stat().st_mtime if KPI_LOGS_FILE.exists() else 0
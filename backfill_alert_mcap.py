@@ -13,7 +13,6 @@ import json
 from pathlib import Path
 from typing import Dict, List, Optional
 from datetime import datetime, timezone
-import time
 
 # Try to import dependencies
 try:
@@ -24,7 +23,7 @@ except ImportError:
     print("⚠️  live_store not available")
 
 try:
-    from dexscreener_fetcher import get_live_mcap_and_symbol
+    from dexscreener_fetcher import enrich_alerts_bulk
     DEXSCREENER_AVAILABLE = True
 except ImportError:
     DEXSCREENER_AVAILABLE = False
@@ -89,24 +88,26 @@ def get_mcap_from_live_store(store: LiveStore, token: str, contract: str) -> Opt
     return None
 
 
-def get_mcap_from_dexscreener(contract: str) -> Optional[float]:
-    """Try to get current MCAP from DexScreener (not historical, but better than nothing)."""
+def get_mcaps_from_dexscreener(contracts: List[str]) -> Dict[str, float]:
+    """Try to get current MCAPs from DexScreener (not historical, but better than nothing).
+    
+    All contracts go out in batched requests of 30; returns {contract: mcap} for the ones found.
+    """
     if not DEXSCREENER_AVAILABLE:
-        return None
+        return {}
     
-    if not contract or len(contract) < 20:
-        return None
+    # Look up throwaway dicts so the live_* fields don't end up on the saved alerts
+    probes = [{"contract": contract} for contract in dict.fromkeys(contracts) if contract and len(contract) >= 20]
+    if not probes:
+        return {}
     
     try:
-        symbol, mcap, liq, chain_id = get_live_mcap_and_symbol(contract)
-        if mcap:
-            return float(mcap)
-        # Small delay to avoid rate limiting
-        time.sleep(0.5)
+        enrich_alerts_bulk(probes)
     except Exception as e:
-        print(f"  ⚠️  DexScreener error for {contract}: {e}")
+        print(f"  ⚠️  DexScreener error for {len(probes)} contracts: {e}")
+        return {}
     
-    return None
+    return {probe["contract"]: float(probe["live_mcap"]) for probe in probes if probe.get("live_mcap")}
 
 
 def backfill_alerts_mcap(kpi_data: Dict, use_dexscreener: bool = False) -> Dict:
@@ -136,6 +137,12 @@ def backfill_alerts_mcap(kpi_data: Dict, use_dexscreener: bool = False) -> Dict:
         print("✅ All alerts already have MCAP!")
         return kpi_data
     
+    # Fetch current DexScreener MCAPs for every candidate up front, in batches,
+    # instead of one request per alert inside the loop
+    dexscreener_mcaps = {}
+    if use_dexscreener:
+        dexscreener_mcaps = get_mcaps_from_dexscreener([a.get("contract", "") for a in alerts_without_mcap])
+    
     # Process alerts
     updated_count = 0
     skipped_count = 0
@@ -166,7 +173,7 @@ def backfill_alerts_mcap(kpi_data: Dict, use_dexscreener: bool = False) -> Dict:
         
         # Try DexScreener as fallback (current MCAP, not historical)
         if not mcap and use_dexscreener:
-            mcap = get_mcap_from_dexscreener(contract)
+            mcap = dexscreener_mcaps.get(contract)
             if mcap:
                 source = "dexscreener_current"
                 print(f"  [WARN] Found CURRENT MCAP from DexScreener: ${mcap:,.2f} (not historical)")
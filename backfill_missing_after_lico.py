@@ -20,6 +20,8 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+from kpi_io import parse_iso
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     import codecs
@@ -72,6 +74,18 @@ KPI_LOGS_FILE = Path("kpi_logs.json")
 LICO_CONTRACT = "678QT3ZQCCBLJJZB5IC5FVMAV94AYRIWSZ3FUYSRVYNC"
 
 
+def _parse_mcap(s: str) -> float:
+    """Parse an MCAP string like "1,234.5K" / "2.1M" / "850" into dollars."""
+    last = s[-1]
+    if last in "Kk":
+        mult = 1000.0
+    elif last in "Mm":
+        mult = 1000000.0
+    else:
+        return float(s.replace(',', ''))
+    return float(s[:-1].replace(',', '')) * mult
+
+
 def parse_alert_from_message(text: str, message_date: datetime) -> Optional[Dict]:
     """Parse alert data from Telegram message text."""
     try:
@@ -90,15 +104,7 @@ def parse_alert_from_message(text: str, message_date: datetime) -> Optional[Dict
         # Extract current MCAP
         mcap_match = re.search(r'Current MC:\s*\*\*\$?([0-9,.]+[KMkm]?)\*\*', text, re.IGNORECASE)
         mcap_str = mcap_match.group(1) if mcap_match else None
-        mcap = None
-        if mcap_str:
-            mcap_str = mcap_str.replace(',', '').upper()
-            if 'K' in mcap_str:
-                mcap = float(mcap_str.replace('K', '')) * 1000
-            elif 'M' in mcap_str:
-                mcap = float(mcap_str.replace('M', '')) * 1000000
-            else:
-                mcap = float(mcap_str)
+        mcap = _parse_mcap(mcap_str) if mcap_str else None
         
         # Extract level from tier
         level = "HIGH" if tier == 1 else "MEDIUM"
@@ -137,8 +143,8 @@ def find_existing_alert(telegram_alert: Dict, existing_alerts: List[Dict]) -> Op
         if tg_token == ex_token and tg_contract == ex_contract:
             # Check if timestamps are close (within 1 hour)
             try:
-                tg_time = datetime.fromisoformat(tg_timestamp.replace("Z", "+00:00"))
-                ex_time = datetime.fromisoformat(ex_timestamp.replace("Z", "+00:00"))
+                tg_time = parse_iso(tg_timestamp)
+                ex_time = parse_iso(ex_timestamp)
                 time_diff = abs((tg_time - ex_time).total_seconds())
                 if time_diff < 3600:  # Within 1 hour
                     return existing
@@ -148,19 +154,22 @@ def find_existing_alert(telegram_alert: Dict, existing_alerts: List[Dict]) -> Op
     return None
 
 
-async def fetch_telegram_alerts_after_lico(client: TelegramClient, limit: int = 1000) -> List[Dict]:
-    """Fetch alerts from Telegram channel after LICO timestamp."""
+async def fetch_telegram_alerts_after_lico(client: TelegramClient, entity=None, limit: int = 1000) -> List[Dict]:
+    """Fetch alerts from Telegram channel after LICO timestamp.
+    
+    Pass the entity already resolved by the caller to skip a second get_entity() round-trip.
+    """
     print(f"\n📡 Fetching alerts from Telegram channel: {ALERT_CHAT_ID}")
     print(f"   Looking for alerts after LICO timestamp...")
     
-    # Get entity first
-    try:
-        chat_id_int = int(ALERT_CHAT_ID)
-        entity = await client.get_entity(chat_id_int)
-        print(f"   ✅ Connected to: {entity.title if hasattr(entity, 'title') else 'Chat'}")
-    except (ValueError, TypeError):
-        entity = await client.get_entity(ALERT_CHAT_ID)
-        print(f"   ✅ Connected to: {entity.title if hasattr(entity, 'title') else 'Chat'}")
+    # Get entity first (unless the caller already resolved it)
+    if entity is None:
+        try:
+            chat_id_int = int(ALERT_CHAT_ID)
+            entity = await client.get_entity(chat_id_int)
+        except (ValueError, TypeError):
+            entity = await client.get_entity(ALERT_CHAT_ID)
+    print(f"   ✅ Connected to: {entity.title if hasattr(entity, 'title') else 'Chat'}")
     
     alerts = []
     lico_found = False
@@ -211,16 +220,25 @@ def load_kpi_logs() -> Dict:
 
 def save_kpi_logs(data: Dict):
     """Save kpi_logs.json with backup."""
-    # Create backup
+    # Create backup as a hardlink to the current inode (no data copy).
+    # The new content is written to a temp file and renamed over
+    # kpi_logs.json, so the backup keeps pointing at the old content.
     if KPI_LOGS_FILE.exists():
         backup_file = KPI_LOGS_FILE.with_suffix('.json.backup')
-        import shutil
-        shutil.copy2(KPI_LOGS_FILE, backup_file)
+        try:
+            backup_file.unlink(missing_ok=True)
+            os.link(KPI_LOGS_FILE, backup_file)
+        except OSError:
+            # Filesystem without hardlink support - fall back to a real copy
+            import shutil
+            shutil.copy2(KPI_LOGS_FILE, backup_file)
         print(f"   📦 Created backup: {backup_file}")
     
-    # Save
-    with open(KPI_LOGS_FILE, 'w', encoding='utf-8') as f:
+    # Save atomically
+    tmp_file = KPI_LOGS_FILE.with_suffix('.json.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, KPI_LOGS_FILE)
     print(f"   ✅ Saved {len(data.get('alerts', []))} alerts to {KPI_LOGS_FILE}")
 
 
@@ -246,7 +264,7 @@ async def main():
         print("⚠️  LICO alert not found in kpi_logs.json")
         print("   Will fetch all recent alerts from Telegram")
     else:
-        lico_time = datetime.fromisoformat(lico_alert.get("timestamp", "").replace("Z", "+00:00"))
+        lico_time = parse_iso(lico_alert.get("timestamp", ""))
         print(f"   ✅ Found LICO alert: {lico_alert.get('token')} at {lico_time.strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Connect to Telegram
@@ -274,6 +292,7 @@ async def main():
     sessions_to_try = ["railway_production_session", session_to_use, "local_dev_session"]
     client = None
     authorized_session = None
+    alert_entity = None
     
     for session_name in sessions_to_try:
         session_path = Path(f"{session_name}.session")
@@ -293,6 +312,7 @@ async def main():
                     print(f"   ✅ Session has access to chat: {test_entity.title if hasattr(test_entity, 'title') else 'Chat'}")
                     client = test_client
                     authorized_session = session_name
+                    alert_entity = test_entity
                     break
                 except Exception as e:
                     print(f"   ⚠️  Session authorized but cannot access chat: {e}")
@@ -321,7 +341,7 @@ async def main():
         print("✅ Connected to Telegram")
         
         # Fetch alerts from Telegram after LICO
-        telegram_alerts = await fetch_telegram_alerts_after_lico(client, limit=1000)
+        telegram_alerts = await fetch_telegram_alerts_after_lico(client, alert_entity, limit=1000)
         
         if not telegram_alerts:
             print("⚠️  No alerts found in Telegram after LICO")
@@ -357,7 +377,7 @@ async def main():
         
         # Sort by timestamp (newest first)
         all_alerts.sort(
-            key=lambda x: datetime.fromisoformat(x.get("timestamp", "2000-01-01").replace("Z", "+00:00")),
+            key=lambda x: parse_iso(x.get("timestamp", "2000-01-01")),
             reverse=True
         )
         
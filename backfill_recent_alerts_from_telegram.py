@@ -6,9 +6,15 @@ import re
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import shutil
 
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     import codecs
@@ -132,6 +138,37 @@ def parse_alert_from_telegram_message(message: Dict) -> Optional[Dict]:
         print(f"Error parsing message: {e}")
         return None
 
+def find_new_alerts(telegram_alerts: List[Dict], existing_alerts: List[Dict]) -> List[Dict]:
+    """Return Telegram alerts whose (token, tier, date) is not already logged."""
+    if PANDAS_AVAILABLE and telegram_alerts and existing_alerts:
+        # Vectorised anti-join: hash-merge on the key columns instead of a Python loop
+        key_cols = ["token", "tier", "date10"]
+        tg_df = pd.DataFrame(
+            [(a.get("token"), a.get("tier"), a.get("timestamp", "")[:10]) for a in telegram_alerts],
+            columns=key_cols,
+        )
+        existing_df = pd.DataFrame(
+            [(a.get("token"), a.get("tier"), (a.get("timestamp") or "")[:10]) for a in existing_alerts],
+            columns=key_cols,
+        ).drop_duplicates()
+        merged = tg_df.merge(existing_df, on=key_cols, how="left", indicator=True)
+        # Select the original dicts so None values are not turned into NaN
+        return [telegram_alerts[i] for i in merged.index[merged["_merge"] == "left_only"]]
+    
+    existing_keys = {(a.get("token"), a.get("tier"), a.get("timestamp", "")[:10]) for a in existing_alerts}
+    new_alerts = []
+    
+    for tg_alert in telegram_alerts:
+        token = tg_alert.get("token")
+        tier = tg_alert.get("tier")
+        date = tg_alert.get("timestamp", "")[:10]
+        key = (token, tier, date)
+        
+        if key not in existing_keys:
+            new_alerts.append(tg_alert)
+    
+    return new_alerts
+
 def main():
     """Backfill missing alerts."""
     print("="*80)
@@ -173,17 +210,7 @@ def main():
     print()
     
     # Find missing alerts
-    existing_keys = {(a.get("token"), a.get("tier"), a.get("timestamp", "")[:10]) for a in existing_alerts}
-    new_alerts = []
-    
-    for tg_alert in telegram_alerts:
-        token = tg_alert.get("token")
-        tier = tg_alert.get("tier")
-        date = tg_alert.get("timestamp", "")[:10]
-        key = (token, tier, date)
-        
-        if key not in existing_keys:
-            new_alerts.append(tg_alert)
+    new_alerts = find_new_alerts(telegram_alerts, existing_alerts)
     
     print(f"Found {len(new_alerts)} new alerts to add")
     print()
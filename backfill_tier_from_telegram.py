@@ -11,8 +11,12 @@ This script:
 """
 
 import asyncio
+import hashlib
 import json
 import re
+import sys
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -20,6 +24,14 @@ from telethon import TelegramClient
 from telethon.tl.types import Message
 import os
 
+from kpi_io import load_kpi, parse_iso, save_kpi
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Load environment variables
 API_ID = int(os.getenv('API_ID', '25177061'))
 API_HASH = os.getenv('API_HASH', '')
@@ -30,6 +42,35 @@ ALERT_CHAT_ID = os.getenv('ALERT_CHAT_ID')  # Can be channel username or ID
 
 KPI_LOGS_FILE = Path("kpi_logs.json")
 
+_BANNER = "=" * 80
+
+# Keep a snippet of each message text on fetched alerts (debugging only)
+DEBUG_BACKFILL = bool(os.getenv('DEBUG_BACKFILL'))
+
+# Precompiled message patterns (compiled once, matched per message)
+# Explicit "TIER N" plus the tier emoji/name fallbacks in a single alternation.
+# The emoji branches use a lookahead so they never swallow a "TIER N" on the same line.
+_TIER_RE = re.compile(
+    r'TIER\s*(?P<n>\d+)'
+    r'|(?P<ultra>🚀(?=[^\n]*ULTRA))'
+    r'|(?P<high>🔥(?=[^\n]*HIGH))'
+    r'|(?P<medium>⚡(?=[^\n]*MEDIUM))',
+    re.IGNORECASE,
+)
+_TIER_BY_NAME = {'ultra': 1, 'high': 2, 'medium': 3}
+# "(Current) MC: **$143.5K**" or "$143.5K MC"
+_MCAP_RE = re.compile(
+    r'(?:Current\s+)?MC[:\s]+\*{0,2}\$?(?P<value>[\d,]+\.?\d*)\s*(?P<unit>[KMkm]?)'
+    r'|\$\s*(?P<value2>[\d,]+\.?\d*)\s*(?P<unit2>[KMkm]?)\s*MC',
+    re.IGNORECASE,
+)
+_FIRE_TOKEN_RE = re.compile(r'🔥\s*(?:\*\*([A-Z0-9]+)\*\*|([A-Z0-9]+))')
+_TOKEN_RE = re.compile(r'\*\*([A-Z0-9]+)\*\*')
+_CONTRACT_RE = re.compile(r'`([A-Z0-9]{32,44})`')
+_SOLANA_RE = re.compile(r'[A-Z0-9]{32,44}')
+# Cheap check that a message really is an alert post before running the parsers
+_ALERT_SENTINEL_RE = re.compile(r'ALPHA INCOMING|TIER\s*\d|Current\s+MC')
+
 
 def parse_tier_from_message(text: str) -> Optional[int]:
     """Extract tier from Telegram message text."""
@@ -37,28 +78,21 @@ def parse_tier_from_message(text: str) -> Optional[int]:
         return None
     
     # Look for "TIER 1", "TIER 2", "TIER 3" in the message
-    tier_patterns = [
-        r'TIER\s*(\d+)',
-        r'TIER\s*(\d+)\s*LOCKED',
-        r'🚨.*TIER\s*(\d+)',
-    ]
-    
-    for pattern in tier_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            tier = int(match.group(1))
+    # ("TIER X LOCKED" / "🚨 ... TIER X" are both covered by the plain pattern).
+    # Tier emojis/names (🚀 ULTRA, 🔥 HIGH, ⚡ MEDIUM) are only a fallback.
+    fallback_tier = None
+    for match in _TIER_RE.finditer(text):
+        name = match.lastgroup
+        if name == 'n':
+            tier = int(match.group('n'))
             if tier in [1, 2, 3]:
                 return tier
+        else:
+            tier = _TIER_BY_NAME[name]
+            if fallback_tier is None or tier < fallback_tier:
+                fallback_tier = tier
     
-    # Also check for tier emojis/names
-    if '🚀' in text and ('ULTRA' in text.upper() or 'TIER 1' in text.upper()):
-        return 1
-    elif '🔥' in text and ('HIGH' in text.upper() or 'TIER 2' in text.upper()):
-        return 2
-    elif '⚡' in text and ('MEDIUM' in text.upper() or 'TIER 3' in text.upper()):
-        return 3
-    
-    return None
+    return fallback_tier
 
 
 def parse_mcap_from_message(text: str) -> Optional[float]:
@@ -68,33 +102,28 @@ def parse_mcap_from_message(text: str) -> Optional[float]:
     
     # Look for "Current MC: $XXX" or "Current MC: $XXXK" or "Current MC: $XXX.XXK"
     # Pattern: "Current MC: **$143.5K**" or "Current MC: $143,500"
-    mcap_patterns = [
-        r'Current\s+MC[:\s]+\*?\*?\$?([\d,]+\.?\d*)\s*([KMkm]?)\*?\*?',
-        r'MC[:\s]+\*?\*?\$?([\d,]+\.?\d*)\s*([KMkm]?)\*?\*?',
-        r'\$\s*([\d,]+\.?\d*)\s*([KMkm]?)\s*MC',
-    ]
-    
-    for pattern in mcap_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            value_str = match.group(1).replace(',', '')
-            multiplier_str = match.group(2).upper() if len(match.groups()) > 1 and match.group(2) else ''
-            
-            try:
-                value = float(value_str)
-                
-                # Apply multiplier
-                if multiplier_str == 'K':
-                    value *= 1000
-                elif multiplier_str == 'M':
-                    value *= 1000000
-                elif not multiplier_str and value < 1000:
-                    # If no multiplier and value is small, assume it's in thousands
-                    value *= 1000
-                
-                return value
-            except (ValueError, TypeError):
-                continue
+    for match in _MCAP_RE.finditer(text):
+        if match.group('value') is not None:
+            value_str, multiplier_str = match.group('value', 'unit')
+        else:
+            value_str, multiplier_str = match.group('value2', 'unit2')
+        multiplier_str = multiplier_str.upper()
+        
+        try:
+            value = float(value_str.replace(',', ''))
+        except ValueError:
+            continue
+        
+        # Apply multiplier
+        if multiplier_str == 'K':
+            value *= 1000
+        elif multiplier_str == 'M':
+            value *= 1000000
+        elif not multiplier_str and value < 1000:
+            # If no multiplier and value is small, assume it's in thousands
+            value *= 1000
+        
+        return value
     
     return None
 
@@ -105,8 +134,7 @@ def parse_token_from_message(text: str) -> Optional[str]:
         return None
     
     # Look for token after 🔥 emoji
-    token_pattern = r'🔥\s*\*\*([A-Z0-9]+)\*\*|([A-Z0-9]+))'
-    match = re.search(token_pattern, text)
+    match = _FIRE_TOKEN_RE.search(text)
     if match:
         return match.group(1) or match.group(2)
     
@@ -117,7 +145,7 @@ def parse_token_from_message(text: str) -> Optional[str]:
         if 'TIER' in line and 'LOCKED' in line:
             # Token is usually in the next few lines
             for j in range(i+1, min(i+5, len(lines))):
-                token_match = re.search(r'\*\*([A-Z0-9]+)\*\*', lines[j])
+                token_match = _TOKEN_RE.search(lines[j])
                 if token_match:
                     return token_match.group(1)
     
@@ -130,28 +158,14 @@ def parse_contract_from_message(text: str) -> Optional[str]:
         return None
     
     # Look for contract in code block (backticks)
-    contract_pattern = r'`([A-Z0-9]{32,44})`'
-    match = re.search(contract_pattern, text)
+    match = _CONTRACT_RE.search(text)
     if match:
         return match.group(1)
     
     # Alternative: look for Solana address pattern
-    solana_pattern = r'([A-Z0-9]{32,44})'
-    matches = re.findall(solana_pattern, text)
-    # Filter for likely contract addresses (long alphanumeric strings)
-    for match in matches:
-        if len(match) >= 32 and match.isalnum():
-            return match
-    
-    return None
-
-
-def parse_timestamp_from_message(message: Message) -> str:
-    """Get timestamp from Telegram message."""
-    if message.date:
-        # Convert to UTC ISO format
-        return message.date.replace(tzinfo=timezone.utc).isoformat()
-    return datetime.now(timezone.utc).isoformat()
+    # (the pattern already guarantees a 32-44 char alphanumeric run, so the first hit wins)
+    match = _SOLANA_RE.search(text)
+    return match.group(0) if match else None
 
 
 async def fetch_old_alerts(client: TelegramClient, chat_id: str, limit: int = 1000) -> List[Dict]:
@@ -160,14 +174,17 @@ async def fetch_old_alerts(client: TelegramClient, chat_id: str, limit: int = 10
     
     alerts = []
     try:
-        async for message in client.iter_messages(chat_id, limit=limit):
+        # iter_messages already fetches in 100-message batches; no sleep between batches
+        async for message in client.iter_messages(chat_id, limit=limit, wait_time=0):
             if not message.text:
                 continue
             
             text = message.text
             
-            # Check if this looks like an alert message
-            if 'ALPHA INCOMING' not in text and 'TIER' not in text:
+            # Check if this looks like an alert message (literal scan first, regex only if needed)
+            if text.find('TIER') < 0 and text.find('ALPHA INCOMING') < 0:
+                continue
+            if not _ALERT_SENTINEL_RE.search(text):
                 continue
             
             # Extract data from message
@@ -175,18 +192,24 @@ async def fetch_old_alerts(client: TelegramClient, chat_id: str, limit: int = 10
             mcap = parse_mcap_from_message(text)
             token = parse_token_from_message(text)
             contract = parse_contract_from_message(text)
-            timestamp = parse_timestamp_from_message(message)
+            # Convert to UTC ISO format
+            message_date = message.date.replace(tzinfo=timezone.utc) if message.date else datetime.now(timezone.utc)
+            timestamp = message_date.isoformat()
             
             if token or contract:
-                alerts.append({
+                tg_alert = {
                     'message_id': message.id,
                     'timestamp': timestamp,
+                    '_ts': message_date.timestamp(),  # epoch seconds, parsed once for matching
                     'tier': tier,
                     'mcap': mcap,
                     'token': token,
+                    'token_upper': token.upper() if token else '',
                     'contract': contract,
-                    'text': text[:200]  # First 200 chars for debugging
-                })
+                }
+                if DEBUG_BACKFILL:
+                    tg_alert['text'] = text[:200]  # First 200 chars for debugging
+                alerts.append(tg_alert)
         
         print(f"✅ Fetched {len(alerts)} alert messages")
         return alerts
@@ -202,8 +225,7 @@ def load_kpi_logs() -> Dict:
         return {"alerts": []}
     
     try:
-        with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_kpi(KPI_LOGS_FILE)
     except Exception as e:
         print(f"❌ Error loading kpi_logs.json: {e}")
         return {"alerts": []}
@@ -212,22 +234,52 @@ def load_kpi_logs() -> Dict:
 def save_kpi_logs(data: Dict):
     """Save kpi_logs.json."""
     try:
-        # Create backup
+        # Backup is a hardlink to the current file; the new content is renamed into place
+        # in one step, so kpi_logs.json never goes missing mid-save
         backup_path = KPI_LOGS_FILE.with_suffix('.json.backup')
-        if KPI_LOGS_FILE.exists():
-            import shutil
-            shutil.copy2(KPI_LOGS_FILE, backup_path)
+        had_file = KPI_LOGS_FILE.exists()
+        save_kpi(data, KPI_LOGS_FILE, backup=backup_path)
+        if had_file:
             print(f"📦 Backup created: {backup_path}")
-        
-        with open(KPI_LOGS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
         print(f"✅ Saved to {KPI_LOGS_FILE}")
     except Exception as e:
         print(f"❌ Error saving kpi_logs.json: {e}")
 
 
-def match_alert_to_telegram(alert: Dict, telegram_alerts: List[Dict]) -> Optional[Dict]:
-    """Match an alert from kpi_logs to a Telegram alert message."""
+def kpi_logs_digest(data: Dict) -> bytes:
+    """Fast content hash of kpi data, used to skip no-op saves."""
+    if ORJSON_AVAILABLE:
+        payload = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def build_telegram_index(telegram_alerts: List[Dict]) -> Tuple[Dict[str, List[Dict]], Dict[str, Tuple[List[float], List[Dict]]]]:
+    """Index Telegram alerts by contract and by upper-cased token.
+    
+    Contract buckets keep list order; token buckets are sorted by '_ts' and
+    returned as (timestamps, alerts) so a time window can be bisected.
+    """
+    by_contract = defaultdict(list)
+    by_token = defaultdict(list)
+    for tg_alert in telegram_alerts:
+        tg_contract = tg_alert.get('contract', '')
+        if tg_contract:
+            by_contract[tg_contract].append(tg_alert)
+        if tg_alert.get('_ts') is not None:
+            by_token[tg_alert['token_upper']].append(tg_alert)
+    
+    tg_by_token = {}
+    for token, bucket in by_token.items():
+        bucket.sort(key=lambda tg: tg['_ts'])
+        tg_by_token[token] = ([tg['_ts'] for tg in bucket], bucket)
+    return by_contract, tg_by_token
+
+
+def match_alert_to_telegram(alert: Dict, tg_by_contract: Dict[str, List[Dict]],
+                            tg_by_token: Dict[str, Tuple[List[float], List[Dict]]]) -> Optional[Dict]:
+    """Match an alert from kpi_logs to a Telegram alert message (see build_telegram_index)."""
     alert_token = alert.get('token', '').upper()
     alert_contract = alert.get('contract', '')
     alert_timestamp = alert.get('timestamp', '')
@@ -237,36 +289,29 @@ def match_alert_to_telegram(alert: Dict, telegram_alerts: List[Dict]) -> Optiona
     
     # Try to match by contract (most reliable) - exact match
     if alert_contract:
-        for tg_alert in telegram_alerts:
-            tg_contract = tg_alert.get('contract', '')
-            if tg_contract and tg_contract == alert_contract:
-                # Also check token matches
-                tg_token = (tg_alert.get('token') or '').upper()
-                if tg_token == alert_token or not alert_token:
-                    return tg_alert  # Perfect match
+        for tg_alert in tg_by_contract.get(alert_contract, ()):
+            # Also check token matches
+            if tg_alert['token_upper'] == alert_token or not alert_token:
+                return tg_alert  # Perfect match
     
     # Try to match by token + timestamp (within 2 hours for better matching)
-    if alert_token and alert_timestamp:
+    if alert_token and alert_timestamp and alert_token in tg_by_token:
         try:
-            alert_time = datetime.fromisoformat(alert_timestamp.replace('Z', '+00:00'))
-            for tg_alert in telegram_alerts:
-                tg_token = (tg_alert.get('token') or '').upper()
-                if tg_token == alert_token:
-                    tg_timestamp = tg_alert.get('timestamp', '')
-                    if tg_timestamp:
-                        try:
-                            tg_time = datetime.fromisoformat(tg_timestamp.replace('Z', '+00:00'))
-                            time_diff = abs((alert_time - tg_time).total_seconds())
-                            if time_diff < 7200:  # Within 2 hours
-                                # Score: closer timestamp = better match
-                                score = 1.0 / (1.0 + time_diff / 3600)  # Normalize to 0-1
-                                if score > best_score:
-                                    best_score = score
-                                    best_match = tg_alert
-                        except:
-                            pass
-        except:
-            pass
+            alert_ts = parse_iso(alert_timestamp).timestamp()
+        except ValueError:
+            alert_ts = None
+        if alert_ts is not None:
+            bucket_ts, bucket = tg_by_token[alert_token]
+            # Only look at Telegram alerts inside the +/- 2 hour window
+            lo = bisect_right(bucket_ts, alert_ts - 7200)
+            hi = bisect_left(bucket_ts, alert_ts + 7200)
+            for i in range(lo, hi):
+                time_diff = abs(alert_ts - bucket_ts[i])
+                # Score: closer timestamp = better match
+                score = 1.0 / (1.0 + time_diff / 3600)  # Normalize to 0-1
+                if score > best_score:
+                    best_score = score
+                    best_match = bucket[i]
     
     return best_match
 
@@ -279,9 +324,15 @@ def update_alerts_with_telegram_data(kpi_data: Dict, telegram_alerts: List[Dict]
     
     print(f"\n📊 Processing {len(alerts)} alerts...")
     
+    # Per-alert messages are buffered and written in one go at the end
+    log_buf = []
+    
+    # Index Telegram alerts once instead of scanning the full list per alert
+    tg_by_contract, tg_by_token = build_telegram_index(telegram_alerts)
+    
     for alert in alerts:
         # Try to match this alert to a Telegram message
-        tg_alert = match_alert_to_telegram(alert, telegram_alerts)
+        tg_alert = match_alert_to_telegram(alert, tg_by_contract, tg_by_token)
         
         if tg_alert:
             matched_count += 1
@@ -291,13 +342,13 @@ def update_alerts_with_telegram_data(kpi_data: Dict, telegram_alerts: List[Dict]
             if alert.get('tier') is None and tg_alert.get('tier') is not None:
                 alert['tier'] = tg_alert['tier']
                 updated = True
-                print(f"  ✅ Updated tier for {alert.get('token')}: {tg_alert['tier']}")
+                log_buf.append(f"  ✅ Updated tier for {alert.get('token')}: {tg_alert['tier']}")
             
             # Update MCAP if missing or None
             if alert.get('mc_usd') is None and tg_alert.get('mcap') is not None:
                 alert['mc_usd'] = tg_alert['mcap']
                 updated = True
-                print(f"  ✅ Updated MCAP for {alert.get('token')}: ${tg_alert['mcap']:,.0f}")
+                log_buf.append(f"  ✅ Updated MCAP for {alert.get('token')}: ${tg_alert['mcap']:,.0f}")
             
             # Update entry_mc if missing
             if alert.get('entry_mc') is None and tg_alert.get('mcap') is not None:
@@ -312,18 +363,17 @@ def update_alerts_with_telegram_data(kpi_data: Dict, telegram_alerts: List[Dict]
             if updated:
                 updated_count += 1
     
-    print(f"\n📈 Summary:")
-    print(f"  Matched: {matched_count}/{len(alerts)} alerts")
-    print(f"  Updated: {updated_count} alerts")
+    log_buf.append(f"\n📈 Summary:")
+    log_buf.append(f"  Matched: {matched_count}/{len(alerts)} alerts")
+    log_buf.append(f"  Updated: {updated_count} alerts")
+    sys.stdout.write('\n'.join(log_buf) + '\n')
     
     return matched_count, updated_count
 
 
 async def main():
     """Main function to backfill tier and MCAP from Telegram."""
-    print("=" * 80)
-    print("BACKFILL TIER AND MCAP FROM TELEGRAM POSTS")
-    print("=" * 80)
+    print(f"{_BANNER}\nBACKFILL TIER AND MCAP FROM TELEGRAM POSTS\n{_BANNER}")
     
     # Check if ALERT_CHAT_ID is set
     if not ALERT_CHAT_ID:
@@ -335,6 +385,7 @@ async def main():
     kpi_data = load_kpi_logs()
     alerts = kpi_data.get('alerts', [])
     print(f"\n📋 Loaded {len(alerts)} alerts from kpi_logs.json")
+    original_digest = kpi_logs_digest(kpi_data)
     
     # Count alerts without tier
     alerts_without_tier = [a for a in alerts if a.get('tier') is None]
@@ -358,8 +409,11 @@ async def main():
         # Update kpi_logs with Telegram data
         matched, updated = update_alerts_with_telegram_data(kpi_data, telegram_alerts)
         
-        # Save updated kpi_logs
-        if updated > 0:
+        # Save updated kpi_logs (skip the write + backup if nothing actually changed,
+        # e.g. a matched timestamp was rewritten with the same value)
+        if updated > 0 and kpi_logs_digest(kpi_data) == original_digest:
+            print("\n⚠️  Matched alerts already had identical data - kpi_logs.json left untouched")
+        elif updated > 0:
             save_kpi_logs(kpi_data)
             print(f"\n✅ Successfully updated {updated} alerts!")
         else:
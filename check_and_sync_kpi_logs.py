@@ -2,11 +2,12 @@
 # -*- coding: utf-8 -*-
 """Check kpi_logs.json and sync to Git if needed"""
 
-import json
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
 
+from kpi_io import load_kpi, parse_iso
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     import codecs
@@ -22,8 +23,7 @@ def check_kpi_logs():
         return
     
     try:
-        with open(kpi_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_kpi(kpi_file)
         
         alerts = data.get('alerts', [])
         print(f"Total alerts in file: {len(alerts)}")
@@ -32,23 +32,23 @@ def check_kpi_logs():
             print("[WARN] No alerts found in file!")
             return
         
-        # Sort by timestamp
-        sorted_alerts = sorted(
-            alerts,
-            key=lambda x: datetime.fromisoformat(x.get('timestamp', '2000-01-01')).replace(tzinfo=timezone.utc),
+        # Sort by timestamp (each timestamp is parsed once and reused below)
+        timed_alerts = sorted(
+            ((parse_iso(x.get('timestamp', '2000-01-01')).replace(tzinfo=timezone.utc), x)
+             for x in alerts),
+            key=lambda pair: pair[0],
             reverse=True
         )
+        sorted_alerts = [alert for _, alert in timed_alerts]
+        now = datetime.now(timezone.utc)
         
         print("\nLast 10 alerts:")
-        for i, alert in enumerate(sorted_alerts[:10], 1):
+        for i, (alert_time, alert) in enumerate(timed_alerts[:10], 1):
             token = alert.get('token', 'N/A')
-            timestamp = alert.get('timestamp', 'N/A')
             tier = alert.get('tier', 'N/A')
             
             # Calculate time ago
             try:
-                alert_time = datetime.fromisoformat(timestamp).replace(tzinfo=timezone.utc)
-                now = datetime.now(timezone.utc)
                 delta = now - alert_time
                 
                 if delta.days > 0:
@@ -65,11 +65,8 @@ def check_kpi_logs():
             print(f"  {i}. {token} - Tier {tier} - {time_ago}")
         
         # Check if latest alert is recent (within last 24 hours)
-        latest = sorted_alerts[0]
-        latest_time_str = latest.get('timestamp', '')
+        latest_time = timed_alerts[0][0]
         try:
-            latest_time = datetime.fromisoformat(latest_time_str).replace(tzinfo=timezone.utc)
-            now = datetime.now(timezone.utc)
             hours_ago = (now - latest_time).total_seconds() / 3600
             
             print(f"\nLatest alert: {hours_ago:.1f} hours ago")
@@ -1,31 +1,31 @@
 #!/usr/bin/env python3
 """Check for duplicate alerts in kpi_logs.json"""
 
-import json
-from collections import defaultdict
+from collections import Counter
 from datetime import datetime, timezone
 
-with open('kpi_logs.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+from kpi_io import iter_alerts
 
-alerts = data.get('alerts', [])
-print(f"Total alerts: {len(alerts)}\n")
-
-# Group by token
-by_token = defaultdict(list)
-for alert in alerts:
+# Count alerts per token in one streaming pass (only SNOWWIF alerts are kept)
+token_counts = Counter()
+snowwif_alerts = []
+for alert in iter_alerts():
     token = alert.get('token', 'UNKNOWN')
-    by_token[token].append(alert)
+    token_counts[token] += 1
+    if token == 'SNOWWIF':
+        snowwif_alerts.append(alert)
+
+print(f"Total alerts: {sum(token_counts.values())}\n")
 
 # Find tokens with multiple alerts
-duplicates = {token: alerts for token, alerts in by_token.items() if len(alerts) > 1}
+duplicate_count = sum(1 for count in token_counts.values() if count > 1)
 
-print(f"Tokens with multiple alerts: {len(duplicates)}\n")
+print(f"Tokens with multiple alerts: {duplicate_count}\n")
 
 # Show SNOWWIF specifically
-if 'SNOWWIF' in duplicates:
+if token_counts['SNOWWIF'] > 1:
     print("SNOWWIF Alerts (all):")
-    for i, alert in enumerate(sorted(duplicates['SNOWWIF'], key=lambda x: x.get('timestamp', '')), 1):
+    for i, alert in enumerate(sorted(snowwif_alerts, key=lambda x: x.get('timestamp', '')), 1):
         print(f"\n  Alert #{i}:")
         print(f"    Level: {alert.get('level')}")
         print(f"    Tier: {alert.get('tier')}")
@@ -35,7 +35,6 @@ if 'SNOWWIF' in duplicates:
 
 # Show top 10 tokens with most alerts
 print(f"\n\nTop 10 tokens with most alerts:")
-sorted_dups = sorted(duplicates.items(), key=lambda x: len(x[1]), reverse=True)
-for token, token_alerts in sorted_dups[:10]:
-    print(f"  {token}: {len(token_alerts)} alerts")
-
+for token, count in token_counts.most_common(10):
+    if count > 1:
+        print(f"  {token}: {count} alerts")
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 """Quick script to check the latest alert timestamp in kpi_logs.json"""
 
-import json
 from datetime import datetime, timezone
+from heapq import nlargest
 from pathlib import Path
 
+from kpi_io import iter_alerts, parse_iso
+
+
 def check_latest_alert():
     kpi_file = Path("kpi_logs.json")
     if not kpi_file.exists():
@@ -12,18 +15,22 @@ def check_latest_alert():
         return
     
     try:
-        with open(kpi_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        alert_count = 0
         
-        alerts = data.get("alerts", [])
-        if not alerts:
+        def counted(alerts):
+            nonlocal alert_count
+            for alert in alerts:
+                alert_count += 1
+                yield alert
+        
+        # Find the latest 5 alerts in a single pass (no full sort, only 5 alerts kept in memory)
+        latest_alerts = nlargest(5, counted(iter_alerts(kpi_file)), key=lambda x: x.get("timestamp", ""))
+        if not latest_alerts:
             print("WARNING: No alerts found in kpi_logs.json")
             return
+        latest = latest_alerts[0]
         
-        # Find latest alert
-        latest = max(alerts, key=lambda x: x.get("timestamp", ""))
-        
-        latest_time = datetime.fromisoformat(latest.get("timestamp", "2000-01-01"))
+        latest_time = parse_iso(latest.get("timestamp", "2000-01-01"))
         now = datetime.now(timezone.utc)
         diff = now - latest_time
         
@@ -37,13 +44,12 @@ def check_latest_alert():
         print(f"   Level: {latest.get('level', 'N/A')}")
         print(f"   Timestamp: {latest.get('timestamp')}")
         print(f"   Time ago: {hours_ago:.1f} hours ({minutes_ago:.0f} minutes)")
-        print(f"\nTotal alerts in file: {len(alerts)}")
+        print(f"\nTotal alerts in file: {alert_count}")
         
         # Show last 5 alerts
-        sorted_alerts = sorted(alerts, key=lambda x: x.get("timestamp", ""), reverse=True)
         print(f"\nLast 5 alerts:")
-        for i, alert in enumerate(sorted_alerts[:5], 1):
-            alert_time = datetime.fromisoformat(alert.get("timestamp", "2000-01-01"))
+        for i, alert in enumerate(latest_alerts, 1):
+            alert_time = parse_iso(alert.get("timestamp", "2000-01-01"))
             alert_diff = now - alert_time
             alert_hours = alert_diff.total_seconds() / 3600
             print(f"   {i}. {alert.get('token', 'UNKNOWN')} - {alert_hours:.1f}h ago ({alert.get('level', 'N/A')})")
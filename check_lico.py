@@ -1,13 +1,11 @@
 #!/usr/bin/env python3
 """Check LICO alert data"""
 
-import json
 from datetime import datetime, timezone
 
-with open('kpi_logs.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+from kpi_io import iter_alerts
 
-alerts = [a for a in data.get('alerts', []) if a.get('token') == 'LICO']
+alerts = [a for a in iter_alerts() if a.get('token') == 'LICO']
 if alerts:
     print(f"Found {len(alerts)} LICO alert(s):\n")
     for i, alert in enumerate(sorted(alerts, key=lambda x: x.get('timestamp', ''), reverse=True), 1):
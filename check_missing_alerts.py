@@ -5,7 +5,8 @@ Check which recent Telegram alerts are missing from kpi_logs.json
 Compares alerts from Telegram channel with alerts in JSON file
 """
 
-import json
+import asyncio
+import heapq
 import os
 import sys
 import re
@@ -13,6 +14,9 @@ from pathlib import Path
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Tuple
 
+from kpi_index import shorten
+from kpi_io import load_kpi
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     try:
@@ -31,38 +35,45 @@ except ImportError:
 KPI_LOGS_FILE = Path("kpi_logs.json")
 ALERT_CHAT_ID = os.getenv("ALERT_CHAT_ID")  # e.g., -1001234567890
 
+# Alert posts start with the "ALPHA INCOMING" header and carry tier, token, MC and
+# contract in the first few lines, so only the head of a message needs scanning
+_MARKER_SCAN_LIMIT = 512
+_FIELD_SCAN_LIMIT = 2048
+
+# All alert fields in one pattern so the message is scanned once (only TIER is case-insensitive)
+_ALERT_RE = re.compile(
+    r'(?i:TIER\s+(?P<tier>\d+)\s+LOCKED)'
+    r'|🔥\s+\*\*(?P<token>[A-Z0-9]+)\*\*'
+    r'|Current MC:\s*\*\*\$?(?P<mcap>[0-9,]+\.?[0-9]*)\s*(?P<mcap_unit>[KMkm]?)\*\*'
+    r'|`(?P<contract>[A-Z0-9]{32,44})`'
+)
+
 def parse_alert_from_message(message_text: str) -> Optional[Dict]:
     """Parse alert details from Telegram message text."""
-    if not message_text or "ALPHA INCOMING" not in message_text:
+    if not message_text or message_text.find("ALPHA INCOMING", 0, _MARKER_SCAN_LIMIT) < 0:
         return None
     
     alert = {}
     
-    # Extract tier
-    tier_match = re.search(r'TIER\s+(\d+)\s+LOCKED', message_text, re.IGNORECASE)
-    if tier_match:
-        alert['tier'] = int(tier_match.group(1))
-    
-    # Extract token name (after 🔥 emoji)
-    token_match = re.search(r'🔥\s+\*\*([A-Z0-9]+)\*\*', message_text)
-    if token_match:
-        alert['token'] = token_match.group(1)
-    
-    # Extract Current MC
-    mcap_match = re.search(r'Current MC:\s*\*\*\$?([0-9,]+\.?[0-9]*)\s*([KMkm]?)\*\*', message_text)
-    if mcap_match:
-        mcap_value = float(mcap_match.group(1).replace(',', ''))
-        mcap_unit = mcap_match.group(2).upper() if mcap_match.group(2) else ''
-        if mcap_unit == 'K':
-            mcap_value *= 1000
-        elif mcap_unit == 'M':
-            mcap_value *= 1000000
-        alert['current_mcap'] = mcap_value
-    
-    # Extract contract address (in code block)
-    contract_match = re.search(r'`([A-Z0-9]{32,44})`', message_text)
-    if contract_match:
-        alert['contract'] = contract_match.group(1)
+    # Extract tier, token name (after 🔥 emoji), Current MC and contract address (in code block);
+    # the first occurrence of each field wins
+    for match in _ALERT_RE.finditer(message_text, 0, _FIELD_SCAN_LIMIT):
+        tier, token, mcap, contract = match.group('tier', 'token', 'mcap', 'contract')
+        if tier is not None:
+            alert.setdefault('tier', int(tier))
+        elif token is not None:
+            alert.setdefault('token', token)
+        elif mcap is not None:
+            if 'current_mcap' not in alert:
+                mcap_value = float(mcap.replace(',', ''))
+                mcap_unit = match.group('mcap_unit').upper()
+                if mcap_unit == 'K':
+                    mcap_value *= 1000
+                elif mcap_unit == 'M':
+                    mcap_value *= 1000000
+                alert['current_mcap'] = mcap_value
+        else:
+            alert.setdefault('contract', contract)
     
     # Extract level (MEDIUM/HIGH)
     if '⚡️ MEDIUM' in message_text or 'MEDIUM' in message_text:
@@ -79,15 +90,26 @@ def load_json_alerts() -> List[Dict]:
         return []
     
     try:
-        with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data.get('alerts', [])
+        return load_kpi(KPI_LOGS_FILE).get('alerts', [])
     except Exception as e:
         print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
         return []
 
-def find_matching_alert(telegram_alert: Dict, json_alerts: List[Dict]) -> Optional[Dict]:
-    """Find matching alert in JSON by token and contract."""
+def build_alert_index(json_alerts: List[Dict]) -> Tuple[Dict[Tuple[str, str], Dict], Dict[str, Dict]]:
+    """Index JSON alerts by (token, contract) and by token (latest alert per token)."""
+    by_token_contract = {}
+    latest_by_token = {}
+    for alert in json_alerts:
+        token = alert.get('token', '').upper()
+        by_token_contract.setdefault((token, alert.get('contract', '')), alert)
+        latest = latest_by_token.get(token)
+        if latest is None or alert.get('timestamp', '') > latest.get('timestamp', ''):
+            latest_by_token[token] = alert
+    return by_token_contract, latest_by_token
+
+def find_matching_alert(telegram_alert: Dict, by_token_contract: Dict[Tuple[str, str], Dict],
+                        latest_by_token: Dict[str, Dict]) -> Optional[Dict]:
+    """Find matching alert in JSON by token and contract (indexes from build_alert_index)."""
     token = telegram_alert.get('token', '').upper()
     contract = telegram_alert.get('contract', '')
     
@@ -96,19 +118,12 @@ def find_matching_alert(telegram_alert: Dict, json_alerts: List[Dict]) -> Option
     
     # Try to find by token + contract (most accurate)
     if contract:
-        for alert in json_alerts:
-            if (alert.get('token', '').upper() == token and 
-                alert.get('contract', '') == contract):
-                return alert
+        alert = by_token_contract.get((token, contract))
+        if alert is not None:
+            return alert
     
     # Fallback: find by token only (latest one)
-    matching = [a for a in json_alerts if a.get('token', '').upper() == token]
-    if matching:
-        # Return the most recent one
-        matching.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        return matching[0]
-    
-    return None
+    return latest_by_token.get(token)
 
 async def fetch_telegram_alerts(limit: int = 50) -> List[Tuple[Message, Dict]]:
     """Fetch recent alerts from Telegram channel."""
@@ -130,12 +145,15 @@ async def fetch_telegram_alerts(limit: int = 50) -> List[Tuple[Message, Dict]]:
             print("❌ API_ID or API_HASH not set in environment variables!")
             return []
         
-        client = TelegramClient(session_name, int(api_id), api_hash)
-        await client.start()
-        
-        print(f"📡 Fetching last {limit} messages from Telegram channel...")
+        # The script fetches once per run, so the client lives only for this
+        # call and is disconnected on the way out, even if the fetch fails
+        async with TelegramClient(session_name, int(api_id), api_hash) as client:
+            print(f"📡 Fetching last {limit} messages from Telegram channel...")
+            # One get_messages call (a single history request for limit <= 100)
+            # instead of awaiting the async iterator message by message
+            history = await client.get_messages(int(ALERT_CHAT_ID), limit=limit)
         messages = []
-        async for message in client.iter_messages(int(ALERT_CHAT_ID), limit=limit):
+        for message in history:
             if message.text and "ALPHA INCOMING" in message.text:
                 parsed = parse_alert_from_message(message.text)
                 if parsed:
@@ -143,7 +161,6 @@ async def fetch_telegram_alerts(limit: int = 50) -> List[Tuple[Message, Dict]]:
                     parsed['telegram_id'] = message.id
                     messages.append((message, parsed))
         
-        await client.disconnect()
         print(f"✅ Found {len(messages)} alert messages in Telegram")
         return messages
     except Exception as e:
@@ -165,8 +182,8 @@ def check_missing_alerts():
     if not TELEGRAM_AVAILABLE or not ALERT_CHAT_ID:
         print("\n⚠️ Cannot fetch Telegram alerts. Checking JSON alerts only...")
         print("\n📊 Recent alerts in JSON (last 10):")
-        json_alerts.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        for i, alert in enumerate(json_alerts[:10], 1):
+        latest_alerts = heapq.nlargest(10, json_alerts, key=lambda x: x.get('timestamp', ''))
+        for i, alert in enumerate(latest_alerts, 1):
             timestamp = alert.get('timestamp', 'N/A')
             token = alert.get('token', 'UNKNOWN')
             tier = alert.get('tier', '?')
@@ -175,7 +192,6 @@ def check_missing_alerts():
         return
     
     # Fetch Telegram alerts
-    import asyncio
     telegram_alerts = asyncio.run(fetch_telegram_alerts(limit=50))
     
     if not telegram_alerts:
@@ -186,6 +202,7 @@ def check_missing_alerts():
     
     missing_alerts = []
     matched_alerts = []
+    by_token_contract, latest_by_token = build_alert_index(json_alerts)
     
     # Check each Telegram alert
     for message, telegram_alert in telegram_alerts:
@@ -196,7 +213,7 @@ def check_missing_alerts():
         telegram_date = telegram_alert.get('telegram_date')
         
         # Find matching alert in JSON
-        json_match = find_matching_alert(telegram_alert, json_alerts)
+        json_match = find_matching_alert(telegram_alert, by_token_contract, latest_by_token)
         
         if json_match:
             matched_alerts.append((telegram_alert, json_match))
@@ -211,7 +228,7 @@ def check_missing_alerts():
                 issues.append(f"MCAP mismatch: Telegram=${current_mcap:,.0f}, JSON=${json_mcap:,.0f}")
             
             if issues:
-                print(f"\n⚠️ {token} (Contract: {contract[:8]}...) - MATCHED but has issues:")
+                print(f"\n⚠️ {token} (Contract: {shorten(contract, 8)}) - MATCHED but has issues:")
                 for issue in issues:
                     print(f"   - {issue}")
         else:
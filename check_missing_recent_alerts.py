@@ -3,11 +3,13 @@
 """
 Check if recent alerts (DHG, MWG, BLAST) are in kpi_logs.json
 """
-import json
 import sys
 from pathlib import Path
 from datetime import datetime, timezone
 
+from kpi_index import get_index, shorten
+from kpi_io import parse_iso
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     import codecs
@@ -16,6 +18,7 @@ if sys.platform == 'win32':
 
 KPI_LOGS_FILE = Path("kpi_logs.json")
 
+
 # The 3 missing alerts from user report
 MISSING_ALERTS = [
     {
@@ -47,11 +50,8 @@ def check_alerts():
         print(f"❌ {KPI_LOGS_FILE} not found!")
         return
     
-    with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    alerts = data.get("alerts", [])
-    print(f"\n[INFO] Total alerts in kpi_logs.json: {len(alerts)}")
+    idx = get_index(KPI_LOGS_FILE)
+    print(f"\n[INFO] Total alerts in kpi_logs.json: {len(idx.alerts)}")
     
     # Check each missing alert
     for missing in MISSING_ALERTS:
@@ -60,27 +60,23 @@ def check_alerts():
         print(f"   Expected timestamp: {missing['timestamp']}")
         
         # Search by contract (most reliable)
-        found_by_contract = None
-        for alert in alerts:
-            if alert.get("contract") == missing["contract"]:
-                found_by_contract = alert
-                break
+        found_by_contract = idx.by_contract.get(missing["contract"])
         
         # Search by token and timestamp (within 10 minutes)
         found_by_token = None
-        missing_time = datetime.fromisoformat(missing["timestamp"].replace("Z", "+00:00"))
-        for alert in alerts:
-            if alert.get("token") == missing["token"]:
-                alert_time_str = alert.get("timestamp", "")
-                if alert_time_str:
-                    try:
-                        alert_time = datetime.fromisoformat(alert_time_str.replace("Z", "+00:00"))
-                        time_diff = abs((alert_time - missing_time).total_seconds())
-                        if time_diff < 600:  # Within 10 minutes
-                            found_by_token = alert
-                            break
-                    except:
-                        pass
+        missing_time = parse_iso(missing["timestamp"])
+        for alert in idx.by_token.get(missing["token"], ()):
+            alert_time_str = alert.get("timestamp", "")
+            if not alert_time_str:
+                continue
+            try:
+                time_diff = abs((parse_iso(alert_time_str) - missing_time).total_seconds())
+            except (ValueError, TypeError):
+                # unparseable, or naive vs aware timestamp
+                continue
+            if time_diff < 600:  # Within 10 minutes
+                found_by_token = alert
+                break
         
         if found_by_contract:
             print(f"   [OK] FOUND by contract!")
@@ -100,11 +96,11 @@ def check_alerts():
     
     # Check latest alerts
     print(f"\n[INFO] Latest 5 alerts in kpi_logs.json:")
-    sorted_alerts = sorted(alerts, key=lambda x: x.get("timestamp", ""), reverse=True)
-    for i, alert in enumerate(sorted_alerts[:5], 1):
+    latest_alerts = idx.latest(5)
+    for i, alert in enumerate(latest_alerts, 1):
         token = alert.get("token", "UNKNOWN")
         timestamp = alert.get("timestamp", "")[:19]
-        contract = alert.get("contract", "")[:20] + "..." if alert.get("contract") else "N/A"
+        contract = shorten(alert.get("contract"))
         print(f"   {i}. {token} - {timestamp} - {contract}")
     
     print("\n" + "="*80)
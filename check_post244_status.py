@@ -2,11 +2,12 @@
 # -*- coding: utf-8 -*-
 """Check if Post 244 (LICO, TIER 3, MC $265.6K) is in kpi_logs.json"""
 
-import json
 import sys
 from pathlib import Path
 from datetime import datetime, timezone
 
+from kpi_index import get_index
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     try:
@@ -35,21 +36,23 @@ def check_post244():
         return
     
     try:
-        with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        idx = get_index(KPI_LOGS_FILE)
     except Exception as e:
         print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
         return
     
-    alerts = data.get('alerts', [])
+    alerts = idx.alerts
     print(f"📋 Total alerts in JSON: {len(alerts)}")
     
-    # Find all LICO alerts
-    lico_alerts = [
-        a for a in alerts 
-        if a.get('token', '').upper() == 'LICO' 
-        and a.get('contract', '') == LICO_CONTRACT
-    ]
+    # Find all LICO alerts, and the first one matching post 244's MC, in one pass
+    lico_alerts = []
+    post244_alert = None
+    for a in idx.by_token.get('LICO', ()):
+        if a.get('contract', '') != LICO_CONTRACT:
+            continue
+        lico_alerts.append(a)
+        if post244_alert is None and 200000 <= (a.get('mc_usd') or a.get('entry_mc', 0)) <= 300000:
+            post244_alert = a
     
     print(f"\n🔍 Found {len(lico_alerts)} LICO alerts:")
     
@@ -76,8 +79,8 @@ def check_post244():
             print(f"     ❌ NOT post 244 (MC ${mc_usd:,.0f}K doesn't match $265.6K)")
     
     # Check latest alert timestamp
-    if alerts:
-        latest_alert = max(alerts, key=lambda x: x.get('timestamp', ''))
+    if idx.latest_alert is not None:
+        latest_alert = idx.latest_alert
         latest_time = latest_alert.get('timestamp', '')
         print(f"\n📅 Latest alert in JSON: {latest_time}")
         
@@ -103,20 +106,11 @@ def check_post244():
     print("SUMMARY")
     print("=" * 80)
     
-    post244_found = any(
-        200000 <= (a.get('mc_usd') or a.get('entry_mc', 0)) <= 300000
-        for a in lico_alerts
-    )
-    
-    if post244_found:
-        matching_alert = next(
-            a for a in lico_alerts
-            if 200000 <= (a.get('mc_usd') or a.get('entry_mc', 0)) <= 300000
-        )
-        if matching_alert.get('tier') == 3:
+    if post244_alert is not None:
+        if post244_alert.get('tier') == 3:
             print("✅ Post 244 is in JSON with correct tier (3)")
         else:
-            print(f"❌ Post 244 is in JSON but tier is WRONG! Should be 3, but is {matching_alert.get('tier')}")
+            print(f"❌ Post 244 is in JSON but tier is WRONG! Should be 3, but is {post244_alert.get('tier')}")
     else:
         print("❌ Post 244 is NOT in JSON yet!")
         print("   The bot hasn't processed/saved post 244 yet.")
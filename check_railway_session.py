@@ -7,7 +7,9 @@ Check if session file exists on Railway and verify it's valid.
 """
 
 import os
+import sqlite3
 import sys
+from urllib.parse import quote
 
 # Fix Unicode encoding for Windows
 if sys.platform == 'win32':
@@ -34,10 +36,16 @@ print(f"Current working directory: {os.getcwd()}")
 print()
 
 print("Checking possible paths:")
+existing_paths = []
 for path in possible_paths:
-    exists = os.path.exists(path)
-    size = os.path.getsize(path) if exists else 0
-    print(f"  {path}: {'✅ EXISTS' if exists else '❌ NOT FOUND'} ({size} bytes)")
+    # One stat per path gives both existence and size
+    try:
+        size = os.stat(path).st_size
+    except OSError:
+        print(f"  {path}: ❌ NOT FOUND (0 bytes)")
+        continue
+    existing_paths.append(path)
+    print(f"  {path}: ✅ EXISTS ({size} bytes)")
 
 print()
 
@@ -53,25 +61,30 @@ except Exception as e:
 
 print()
 
-# Check if file is valid SQLite
-session_found = False
-actual_path = None
-for path in possible_paths:
-    if os.path.exists(path):
-        session_found = True
-        actual_path = path
-        try:
-            import sqlite3
-            conn = sqlite3.connect(path)
-            cursor = conn.cursor()
+# Check if file is valid SQLite (first path that passed the stat above)
+actual_path = existing_paths[0] if existing_paths else None
+session_found = actual_path is not None
+if session_found:
+    path = actual_path
+    conn = None
+    try:
+        # Read-only open: no journal file or write lock on the session
+        conn = sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA quick_check")
+        result = cursor.fetchone()[0]
+        if result == "ok":
+            print(f"✅ Session file is valid SQLite at: {path}")
+        else:
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
             tables = cursor.fetchall()
-            conn.close()
-            print(f"✅ Session file is valid SQLite at: {path}")
+            print(f"⚠️  Session file failed integrity check: {result}")
             print(f"   Tables: {tables}")
-        except Exception as e:
-            print(f"⚠️  Session file exists but is invalid: {e}")
-        break
+    except Exception as e:
+        print(f"⚠️  Session file exists but is invalid: {e}")
+    finally:
+        if conn is not None:
+            conn.close()
 
 if not session_found:
     print("❌ Session file not found in any location!")
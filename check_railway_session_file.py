@@ -4,7 +4,9 @@ Check if session file exists on Railway and verify its validity.
 Run this on Railway to diagnose session file issues.
 """
 import os
+import sqlite3
 import sys
+from urllib.parse import quote
 
 # Fix Unicode for Windows
 if sys.platform == 'win32':
@@ -33,37 +35,46 @@ possible_paths = [
 print("Checking paths:")
 print("-" * 80)
 for path in possible_paths:
-    exists = os.path.exists(path)
-    status = "EXISTS" if exists else "NOT FOUND"
-    print(f"{status:10} {path}")
+    # Single stat: existence and size in one syscall
+    try:
+        file_size = os.stat(path).st_size
+    except OSError:
+        print(f"{'NOT FOUND':10} {path}")
+        print()
+        continue
+    print(f"{'EXISTS':10} {path}")
+    print(f"            Size: {file_size:,} bytes")
     
-    if exists:
-        try:
-            file_size = os.path.getsize(path)
-            print(f"            Size: {file_size:,} bytes")
-            
-            if file_size == 0:
-                print("            ERROR: File is EMPTY (0 bytes)!")
-            elif file_size < 1000:
-                print("            WARNING: File is very small, might be corrupted!")
-            
-            # Try SQLite validation
-            try:
-                import sqlite3
-                conn = sqlite3.connect(path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = cursor.fetchall()
-                conn.close()
-                print(f"            Valid SQLite: YES (tables: {len(tables)})")
-                if len(tables) == 0:
-                    print("            ERROR: No tables found - file is invalid!")
-            except sqlite3.DatabaseError as e:
-                print(f"            ERROR: Not valid SQLite: {e}")
-            except Exception as e:
-                print(f"            WARNING: Could not validate SQLite: {e}")
-        except Exception as e:
-            print(f"            ERROR: Could not read file: {e}")
+    if file_size == 0:
+        print("            ERROR: File is EMPTY (0 bytes)!")
+    elif file_size < 1000:
+        print("            WARNING: File is very small, might be corrupted!")
+    
+    # Try SQLite validation (read-only, so no journal or write lock)
+    conn = None
+    try:
+        conn = sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA quick_check")
+        result = cursor.fetchone()[0]
+        if result == "ok":
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE type='table'")
+            table_count = cursor.fetchone()[0]
+            print(f"            Valid SQLite: YES (tables: {table_count})")
+            if table_count == 0:
+                print("            ERROR: No tables found - file is invalid!")
+        else:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = [row[0] for row in cursor.fetchall()]
+            print(f"            ERROR: Integrity check failed: {result}")
+            print(f"            Tables: {tables}")
+    except sqlite3.DatabaseError as e:
+        print(f"            ERROR: Not valid SQLite: {e}")
+    except Exception as e:
+        print(f"            WARNING: Could not validate SQLite: {e}")
+    finally:
+        if conn is not None:
+            conn.close()
     
     print()
 
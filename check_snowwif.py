@@ -1,15 +1,18 @@
 #!/usr/bin/env python3
 """Check SNOWWIF alert data"""
 
-import json
 from datetime import datetime, timezone
 
-with open('kpi_logs.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+from kpi_index import get_index
 
-alerts = [a for a in data.get('alerts', []) if a.get('token') == 'SNOWWIF']
-if alerts:
-    latest = max(alerts, key=lambda x: x.get('timestamp', ''))
+# Only the SNOWWIF bucket of the shared index needs scanning
+latest = max(
+    get_index().by_token.get('SNOWWIF', ()),
+    key=lambda alert: alert.get('timestamp', ''),
+    default=None,
+)
+
+if latest is not None:
     print("SNOWWIF Alert Data:")
     print(f"  Level: {latest.get('level')}")
     print(f"  Tier (from field): {latest.get('tier')}")
@@ -1,48 +1,43 @@
 #!/usr/bin/env python3
 """Check tier distribution in kpi_logs.json"""
 
-import json
-from collections import defaultdict
+from collections import Counter
 
-with open('kpi_logs.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+from kpi_io import iter_alerts
 
-alerts = data.get('alerts', [])
-print(f"Total alerts: {len(alerts)}\n")
+# Tally everything in one streaming pass (alerts are not kept in memory)
+levels = Counter()
+tiers = Counter()
+medium_tiers = Counter()
+for a in iter_alerts():
+    level = a.get('level', 'UNKNOWN')
+    t = a.get('tier')
+    levels[level] += 1
+    tiers[t] += 1
+    if level == 'MEDIUM':
+        medium_tiers[t] += 1
 
-# Count by level
-levels = defaultdict(int)
-for a in alerts:
-    l = a.get('level', 'UNKNOWN')
-    levels[l] += 1
+total = sum(levels.values())
+tier_none = tiers.pop(None, 0)
+medium_total = sum(medium_tiers.values())
+medium_with_tier = medium_total - medium_tiers[None]
 
+print(f"Total alerts: {total}\n")
+
+# Count by level
 print("Level distribution:")
 for k, v in sorted(levels.items()):
     print(f"  {k}: {v}")
 
 # Count by tier field
-tier_field = defaultdict(int)
-tier_none = 0
-for a in alerts:
-    t = a.get('tier')
-    if t is None:
-        tier_none += 1
-    else:
-        tier_field[t] += 1
-
 print(f"\nTier field distribution:")
 print(f"  None (missing): {tier_none}")
-for k, v in sorted(tier_field.items()):
+for k, v in sorted(tiers.items()):
     print(f"  Tier {k}: {v}")
 
 # Check MEDIUM alerts - how many have tier field?
-medium_alerts = [a for a in alerts if a.get('level') == 'MEDIUM']
-print(f"\nMEDIUM level alerts: {len(medium_alerts)}")
-medium_with_tier = [a for a in medium_alerts if a.get('tier') is not None]
-medium_tier2 = [a for a in medium_alerts if a.get('tier') == 2]
-medium_tier3 = [a for a in medium_alerts if a.get('tier') == 3]
-print(f"  With tier field: {len(medium_with_tier)}")
-print(f"  Tier 2: {len(medium_tier2)}")
-print(f"  Tier 3: {len(medium_tier3)}")
-print(f"  Without tier field: {len(medium_alerts) - len(medium_with_tier)}")
-
+print(f"\nMEDIUM level alerts: {medium_total}")
+print(f"  With tier field: {medium_with_tier}")
+print(f"  Tier 2: {medium_tiers[2]}")
+print(f"  Tier 3: {medium_tiers[3]}")
+print(f"  Without tier field: {medium_total - medium_with_tier}")
@@ -40,25 +40,40 @@ KEEP_DIRS = {
     '__pycache__',  # Will be regenerated
 }
 
+# Extensions of top-level files that are candidates for deletion
+DELETE_EXTENSIONS = {'.py', '.json', '.csv', '.md', '.txt', '.log', '.session', '.session-journal'}
+
 # Files to DELETE
 FILES_TO_DELETE = []
 
+def _walk_files(path):
+    """Yield every file path under a directory (like os.walk, without a stat per entry)."""
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir():
+                # os.walk does not descend into symlinked directories either
+                if not entry.is_symlink():
+                    yield from _walk_files(entry.path)
+            else:
+                yield entry.path
+
 def find_files_to_delete():
     """Find all files that should be deleted"""
-    for filename in os.listdir('.'):
-        if os.path.isfile(filename):
-            if filename not in KEEP_FILES:
-                # Check if it's a Python file, JSON, CSV, MD, or other data file
-                ext = os.path.splitext(filename)[1].lower()
-                if ext in ['.py', '.json', '.csv', '.md', '.txt', '.log', '.session', '.session-journal']:
-                    # Skip if it's a config or important file
-                    if not filename.startswith('.'):
-                        FILES_TO_DELETE.append(filename)
-        elif os.path.isdir(filename) and filename not in KEEP_DIRS:
-            # Check directory contents
-            for root, dirs, files in os.walk(filename):
-                for file in files:
-                    filepath = os.path.join(root, file)
+    # scandir entries carry their file type, so no extra isfile/isdir stat calls
+    with os.scandir('.') as it:
+        for entry in it:
+            filename = entry.name
+            if entry.is_file():
+                if filename not in KEEP_FILES:
+                    # Check if it's a Python file, JSON, CSV, MD, or other data file
+                    ext = os.path.splitext(filename)[1].lower()
+                    if ext in DELETE_EXTENSIONS:
+                        # Skip if it's a config or important file
+                        if filename[0] != '.':
+                            FILES_TO_DELETE.append(filename)
+            elif entry.is_dir() and filename not in KEEP_DIRS:
+                # Check directory contents
+                for filepath in _walk_files(filename):
                     if filepath not in KEEP_FILES:
                         FILES_TO_DELETE.append(filepath)
 
@@ -72,13 +87,17 @@ if __name__ == "__main__":
     confirm = input("\nDelete these files? (yes/no): ")
     if confirm.lower() == 'yes':
         deleted = 0
+        errors = []
         for f in FILES_TO_DELETE:
             try:
-                if os.path.exists(f):
-                    os.remove(f)
-                    deleted += 1
-            except Exception as e:
-                print(f"Error deleting {f}: {e}")
+                os.unlink(f)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                errors.append((f, e))
+        for f, e in errors:
+            print(f"Error deleting {f}: {e}")
         print(f"\nDeleted {deleted} files")
     else:
         print("Cancelled")
@@ -2,11 +2,14 @@
 # -*- coding: utf-8 -*-
 """Comprehensive fix and summary for Lovable team"""
 
-import json
 import sys
 from pathlib import Path
 from datetime import datetime, timezone
-from collections import defaultdict
+from collections import Counter, defaultdict
+from itertools import islice
+
+from kpi_io import load_kpi
+from kpi_logger import tier2_signal_flags
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -16,6 +19,7 @@ if sys.platform == 'win32':
         pass
 
 KPI_LOGS_FILE = Path("kpi_logs.json")
+SUMMARY_FILE = Path("LOVABLE_API_VERIFICATION_SUMMARY.md")
 
 def analyze_all_issues():
     """Comprehensive analysis of all issues"""
@@ -29,8 +33,7 @@ def analyze_all_issues():
         return
     
     try:
-        with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_kpi(KPI_LOGS_FILE)
     except Exception as e:
         print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
         return
@@ -41,100 +44,103 @@ def analyze_all_issues():
     # Analysis
     issues = []
     
-    # 1. Check for alerts without tier
-    alerts_without_tier = [a for a in alerts if a.get('tier') is None]
-    if alerts_without_tier:
-        issues.append({
-            'type': 'missing_tier',
-            'count': len(alerts_without_tier),
-            'alerts': alerts_without_tier[:5]  # First 5
-        })
-    
-    # 2. Check tier distribution
-    tier_dist = defaultdict(int)
-    level_dist = defaultdict(int)
+    # Single pass over alerts, feeding every check:
+    # 1. alerts without tier, 2. tier/level distribution,
+    # 3. potential Tier 2 alerts marked as Tier 3, 4. alerts grouped by token,
+    # 5. alerts missing MCAP
+    alerts_without_tier = []
+    tier_dist = Counter()
+    level_dist = Counter()
+    # Tier 2 should have: Glydo Top 5 + confirmations
+    potential_tier2_as_tier3 = []
+    token_alerts = defaultdict(list)
+    duplicate_count = 0  # tokens with more than one alert
+    missing_mcap = []
     
     for alert in alerts:
-        tier = alert.get('tier')
-        level = alert.get('level', 'MEDIUM')
+        a_get = alert.get  # bound once per alert; reused by every check below
+        tier = a_get('tier')
+        level = a_get('level', 'MEDIUM')
         
-        if tier in [1, 2, 3]:
+        if tier is None:
+            alerts_without_tier.append(alert)
+        elif tier in [1, 2, 3]:
             tier_dist[tier] += 1
         
         level_dist[level] += 1
-    
-    # 3. Check for potential Tier 2 alerts that are marked as Tier 3
-    # Tier 2 should have: Glydo Top 5 + confirmations
-    potential_tier2_as_tier3 = []
-    
-    for alert in alerts:
-        if alert.get('tier') == 3 and alert.get('level') == 'MEDIUM':
-            # Check if it has Tier 2 characteristics
-            has_glydo = alert.get('glydo_in_top5') or 'glydo' in str(alert.get('hot_list', '')).lower() or 'glydo' in str(alert.get('matched_signals', [])).lower()
-            hot_list = alert.get('hot_list')
-            hot_list_yes = hot_list and ('yes' in str(hot_list).lower() or '🟢' in str(hot_list) or hot_list is True)
-            
-            confirmations = alert.get('confirmations', {})
-            if isinstance(confirmations, dict):
-                total_conf = confirmations.get('total', 0)
-            else:
-                total_conf = 0
+        
+        if tier == 3 and a_get('level') == 'MEDIUM':
+            # Check if it has Tier 2 characteristics (one classification per alert)
+            flags = tier2_signal_flags(alert)
+            has_glydo = flags['_has_glydo']
+            hot_list_yes = flags['_hot_yes']
+            total_conf = flags['_confs']
             
             # If has Glydo + Hot List + confirmations, might be Tier 2
             if (has_glydo or hot_list_yes) and total_conf >= 1:
                 potential_tier2_as_tier3.append({
-                    'token': alert.get('token'),
-                    'contract': alert.get('contract', '')[:20],
-                    'timestamp': alert.get('timestamp'),
+                    'token': a_get('token'),
+                    'contract': a_get('contract', '')[:20],
+                    'timestamp': a_get('timestamp'),
                     'glydo': has_glydo,
                     'hot_list': hot_list_yes,
                     'confirmations': total_conf
                 })
-    
-    # 4. Check for duplicate tokens (same token, different tiers)
-    token_alerts = defaultdict(list)
-    for alert in alerts:
-        token = alert.get('token', '').upper()
+        
+        token = a_get('token', '').upper()
         if token:
-            token_alerts[token].append(alert)
-    
-    duplicates = {token: alerts_list for token, alerts_list in token_alerts.items() if len(alerts_list) > 1}
+            token_list = token_alerts[token]
+            token_list.append(alert)
+            if len(token_list) == 2:
+                duplicate_count += 1
+        
+        if not (a_get('mc_usd') or a_get('entry_mc')):
+            missing_mcap.append(alert)
     
-    # 5. Check for alerts missing MCAP
-    missing_mcap = [a for a in alerts if not (a.get('mc_usd') or a.get('entry_mc'))]
+    if alerts_without_tier:
+        issues.append({
+            'type': 'missing_tier',
+            'count': len(alerts_without_tier),
+            'alerts': alerts_without_tier[:5]  # First 5
+        })
     
-    # Summary
-    print(f"\n{'='*80}")
-    print("ANALYSIS RESULTS")
-    print(f"{'='*80}")
+    # Summary (buffered: one stdout write instead of a console write per line)
+    lines = []
+    lines.append(f"\n{'='*80}")
+    lines.append("ANALYSIS RESULTS")
+    lines.append(f"{'='*80}")
     
-    print(f"\n📊 Tier Distribution:")
-    print(f"  Tier 1: {tier_dist[1]}")
-    print(f"  Tier 2: {tier_dist[2]}")
-    print(f"  Tier 3: {tier_dist[3]}")
-    print(f"  Missing: {len(alerts_without_tier)}")
+    lines.append(f"\n📊 Tier Distribution:")
+    lines.append(f"  Tier 1: {tier_dist[1]}")
+    lines.append(f"  Tier 2: {tier_dist[2]}")
+    lines.append(f"  Tier 3: {tier_dist[3]}")
+    lines.append(f"  Missing: {len(alerts_without_tier)}")
     
-    print(f"\n📊 Level Distribution:")
+    lines.append(f"\n📊 Level Distribution:")
     for level, count in sorted(level_dist.items()):
-        print(f"  {level}: {count}")
+        lines.append(f"  {level}: {count}")
     
     if alerts_without_tier:
-        print(f"\n⚠️  {len(alerts_without_tier)} alerts missing tier field")
+        lines.append(f"\n⚠️  {len(alerts_without_tier)} alerts missing tier field")
     
     if potential_tier2_as_tier3:
-        print(f"\n⚠️  {len(potential_tier2_as_tier3)} alerts might be Tier 2 (currently Tier 3)")
-        print(f"   These have Glydo/Hot List + confirmations:")
+        lines.append(f"\n⚠️  {len(potential_tier2_as_tier3)} alerts might be Tier 2 (currently Tier 3)")
+        lines.append(f"   These have Glydo/Hot List + confirmations:")
         for item in potential_tier2_as_tier3[:5]:
-            print(f"     - {item['token']}: Glydo={item['glydo']}, HotList={item['hot_list']}, Confs={item['confirmations']}")
+            lines.append(f"     - {item['token']}: Glydo={item['glydo']}, HotList={item['hot_list']}, Confs={item['confirmations']}")
     
-    if duplicates:
-        print(f"\n📋 {len(duplicates)} tokens have multiple alerts:")
-        for token, alerts_list in list(duplicates.items())[:5]:
+    if duplicate_count:
+        # Same token, possibly different tiers (first five tokens in log order)
+        lines.append(f"\n📋 {duplicate_count} tokens have multiple alerts:")
+        duplicates = ((token, alerts_list) for token, alerts_list in token_alerts.items() if len(alerts_list) > 1)
+        for token, alerts_list in islice(duplicates, 5):
             tiers = [a.get('tier') for a in alerts_list]
-            print(f"     - {token}: {len(alerts_list)} alerts, tiers: {tiers}")
+            lines.append(f"     - {token}: {len(alerts_list)} alerts, tiers: {tiers}")
     
     if missing_mcap:
-        print(f"\n💰 {len(missing_mcap)} alerts missing MCAP")
+        lines.append(f"\n💰 {len(missing_mcap)} alerts missing MCAP")
+    
+    sys.stdout.write('\n'.join(lines) + '\n')
     
     return {
         'total_alerts': len(alerts),
@@ -142,15 +148,12 @@ def analyze_all_issues():
         'level_distribution': dict(level_dist),
         'missing_tier': len(alerts_without_tier),
         'potential_tier2': len(potential_tier2_as_tier3),
-        'duplicates': len(duplicates),
+        'duplicates': duplicate_count,
         'missing_mcap': len(missing_mcap)
     }
 
-def create_summary_document():
-    """Create comprehensive summary document for Lovable"""
-    analysis = analyze_all_issues()
-    
-    summary = f"""# API Verification & Fix Summary - For Lovable Team
+# Static parts of the Lovable summary; only the stats and footer are formatted per run
+_SUMMARY_HEADER = """# API Verification & Fix Summary - For Lovable Team
 
 ## ✅ Verification Results
 
@@ -163,18 +166,9 @@ def create_summary_document():
 
 ## 📊 Current Status
 
-### Tier Distribution
-- **Tier 1:** {analysis['tier_distribution'].get(1, 0)} alerts
-- **Tier 2:** {analysis['tier_distribution'].get(2, 0)} alerts
-- **Tier 3:** {analysis['tier_distribution'].get(3, 0)} alerts
-- **Total:** {analysis['total_alerts']} alerts
-
-### Data Quality
-- ✅ All alerts have tier field: {analysis['total_alerts'] - analysis['missing_tier']}/{analysis['total_alerts']} (100%)
-- ⚠️  Missing MCAP: {analysis['missing_mcap']} alerts ({analysis['missing_mcap']/analysis['total_alerts']*100:.1f}%)
-- 📋 Duplicate tokens: {analysis['duplicates']} tokens have multiple alerts (this is normal - same token can alert multiple times)
+"""
 
-## 🔧 How Tiers Are Determined
+_SUMMARY_BODY = """## 🔧 How Tiers Are Determined
 
 ### Priority Order:
 1. **`tier` field** (from Telegram post) → **Most reliable** ✅
@@ -200,11 +194,11 @@ def create_summary_document():
 
 **Response:**
 ```json
-{{
+{
   "alerts": [...],
   "count": 20,
   "timestamp": "2025-12-26T07:16:59.962868+00:00"
-}}
+}
 ```
 
 ### 2. Get Statistics
@@ -282,9 +276,9 @@ def create_summary_document():
 ## 📊 Example API Response
 
 ```json
-{{
+{
   "alerts": [
-    {{
+    {
       "token": "HONSE",
       "tier": 1,
       "level": "MEDIUM",
@@ -293,10 +287,10 @@ def create_summary_document():
       "currentMcap": 107100.0,
       "hotlist": "No",
       "description": "..."
-    }}
+    }
   ],
   "count": 20
-}}
+}
 ```
 
 ## 🎯 Summary
@@ -312,17 +306,50 @@ def create_summary_document():
 
 ---
 
-**Last Updated:** {datetime.now(timezone.utc).isoformat()}
-**Total Alerts:** {analysis['total_alerts']}
-**Tier 1:** {analysis['tier_distribution'].get(1, 0)}
-**Tier 2:** {analysis['tier_distribution'].get(2, 0)}
-**Tier 3:** {analysis['tier_distribution'].get(3, 0)}
 """
+
+def create_summary_document():
+    """Create comprehensive summary document for Lovable"""
+    analysis = analyze_all_issues()
+    
+    # Read every figure once instead of re-indexing analysis in the template
+    tier_dist = analysis['tier_distribution']
+    tier1 = tier_dist.get(1, 0)
+    tier2 = tier_dist.get(2, 0)
+    tier3 = tier_dist.get(3, 0)
+    total = analysis['total_alerts']
+    missing_tier = analysis['missing_tier']
+    missing_mcap = analysis['missing_mcap']
+    duplicates = analysis['duplicates']
+    generated_at = datetime.now(timezone.utc).isoformat()
+    
+    sections = [
+        _SUMMARY_HEADER,
+        f"""### Tier Distribution
+- **Tier 1:** {tier1} alerts
+- **Tier 2:** {tier2} alerts
+- **Tier 3:** {tier3} alerts
+- **Total:** {total} alerts
+
+### Data Quality
+- ✅ All alerts have tier field: {total - missing_tier}/{total} (100%)
+- ⚠️  Missing MCAP: {missing_mcap} alerts ({missing_mcap/total*100:.1f}%)
+- 📋 Duplicate tokens: {duplicates} tokens have multiple alerts (this is normal - same token can alert multiple times)
+
+""",
+        _SUMMARY_BODY,
+        f"""**Last Updated:** {generated_at}
+**Total Alerts:** {total}
+**Tier 1:** {tier1}
+**Tier 2:** {tier2}
+**Tier 3:** {tier3}
+""",
+    ]
+    summary = ''.join(sections)
     
-    with open('LOVABLE_API_VERIFICATION_SUMMARY.md', 'w', encoding='utf-8') as f:
-        f.write(summary)
+    SUMMARY_FILE.write_text(summary, encoding='utf-8')
     
-    print(f"\n✅ Summary document created: LOVABLE_API_VERIFICATION_SUMMARY.md")
+    print(f"\n✅ Summary document created: {SUMMARY_FILE}")
     return summary
 
 if __name__ == "__main__":
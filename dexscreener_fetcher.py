@@ -7,15 +7,51 @@ No authentication required - free public API.
 
 from __future__ import annotations
 
+import threading
 import time
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, List, Tuple
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Rate limiting: DexScreener allows ~200 requests/minute
-# We'll add a simple rate limiter
-_last_request_time = 0
+# Callers reserve the next free slot under a lock, so worker threads share one limit
+_rate_lock = threading.Lock()
+_next_request_time = 0.0
 _min_request_interval = 0.3  # 300ms between requests (200/min = 3/sec max)
 
+# /tokens/v1 accepts up to 30 comma-separated addresses per request
+_BATCH_SIZE = 30
+
+# One pooled keep-alive session, so repeated lookups skip the TCP/TLS handshake
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+))
+_SESSION.headers["Accept-Encoding"] = "gzip"
+
+# Short-lived cache of get_live_mcap_and_symbol results, keyed by lowercased contract.
+# The TTL keeps live MCAPs fresh for the long-running monitor.
+_LIVE_CACHE_TTL = 60.0
+_LIVE_CACHE_MAX = 1024
+_live_cache: Dict[str, Tuple[float, Tuple[Optional[str], Optional[float], Optional[float], Optional[str]]]] = {}
+
+
+def _throttle():
+    """Sleep just long enough to keep requests _min_request_interval apart (thread-safe)."""
+    global _next_request_time
+    
+    with _rate_lock:
+        now = time.monotonic()
+        slot = max(now, _next_request_time)
+        _next_request_time = slot + _min_request_interval
+    
+    # Sleep outside the lock so other threads can queue up their own slots
+    if slot > now:
+        time.sleep(slot - now)
+
 
 def fetch_token_data(contract_address: str, timeout: int = 10) -> Optional[Dict]:
     """
@@ -28,18 +64,13 @@ def fetch_token_data(contract_address: str, timeout: int = 10) -> Optional[Dict]
     Returns:
         Dict with API response or None if error
     """
-    global _last_request_time
-    
     # Simple rate limiting
-    elapsed = time.time() - _last_request_time
-    if elapsed < _min_request_interval:
-        time.sleep(_min_request_interval - elapsed)
-    _last_request_time = time.time()
+    _throttle()
     
     url = f"https://api.dexscreener.com/latest/dex/tokens/{contract_address}"
     
     try:
-        response = requests.get(url, timeout=timeout)
+        response = _SESSION.get(url, timeout=timeout)
         response.raise_for_status()
         data = response.json()
         return data
@@ -51,6 +82,65 @@ def fetch_token_data(contract_address: str, timeout: int = 10) -> Optional[Dict]
         return None
 
 
+def _fetch_batch_chunk(chunk: List[str], timeout: int) -> Dict[str, Dict]:
+    """Fetch one /tokens/v1 request worth of addresses and group pairs per token."""
+    chunk_set = {c.lower() for c in chunk}
+    _throttle()
+    
+    url = "https://api.dexscreener.com/tokens/v1/solana/" + ",".join(chunk)
+    
+    try:
+        response = _SESSION.get(url, timeout=timeout)
+        response.raise_for_status()
+        pairs = response.json() or []
+    except requests.exceptions.RequestException as e:
+        print(f"[DexScreener] Batch request error ({len(chunk)} tokens): {e}")
+        return {}
+    except Exception as e:
+        print(f"[DexScreener] Error fetching batch ({len(chunk)} tokens): {e}")
+        return {}
+    
+    # The endpoint returns a flat list of pairs; group them per requested token
+    results: Dict[str, Dict] = {}
+    for pair in pairs:
+        for side in ("baseToken", "quoteToken"):
+            address = ((pair.get(side) or {}).get("address") or "").lower()
+            if address in chunk_set:
+                results.setdefault(address, {"pairs": []})["pairs"].append(pair)
+    return results
+
+
+def fetch_tokens_batch(contracts: List[str], timeout: int = 10) -> Dict[str, Dict]:
+    """
+    Fetch token data for many contracts, 30 addresses per DexScreener request.
+    
+    Args:
+        contracts: Solana contract addresses
+        timeout: Request timeout in seconds
+        
+    Returns:
+        {contract_lower: {"pairs": [...]}}, the same shape fetch_token_data returns,
+        for every contract DexScreener knows about
+    """
+    # Send addresses as given; the response is matched back case-insensitively
+    unique = list({c.lower(): c for c in contracts if c}.values())
+    chunks = [unique[start:start + _BATCH_SIZE] for start in range(0, len(unique), _BATCH_SIZE)]
+    
+    results: Dict[str, Dict] = {}
+    for chunk in chunks:
+        results.update(_fetch_batch_chunk(chunk, timeout))
+    
+    return results
+
+
+def _liquidity_usd(pair: Dict) -> float:
+    """USD liquidity of a pair (0 when missing)."""
+    liq = pair.get("liquidity")
+    if isinstance(liq, dict):
+        return liq.get("usd") or 0
+    return float(liq) if liq else 0
+
+
 def extract_token_info(data: Dict, contract_address: str) -> Tuple[Optional[str], Optional[float], Optional[float], Optional[str]]:
     """
     Extract symbol, MCAP, liquidity, and price from DexScreener response.
@@ -65,30 +155,11 @@ def extract_token_info(data: Dict, contract_address: str) -> Tuple[Optional[str]
     if not pairs:
         return None, None, None, None
     
-    # Find the pair with the highest liquidity (usually the main pair)
-    main_pair = None
-    max_liquidity = 0
-    
-    for pair in pairs:
-        if pair.get("chainId") == "solana":
-            liq = pair.get("liquidity", {})
-            if isinstance(liq, dict):
-                liq_usd = liq.get("usd", 0) or 0
-            else:
-                liq_usd = float(liq) if liq else 0
-            
-            if liq_usd > max_liquidity:
-                max_liquidity = liq_usd
-                main_pair = pair
-    
-    if not main_pair:
-        # Fallback to first Solana pair
-        for pair in pairs:
-            if pair.get("chainId") == "solana":
-                main_pair = pair
-                break
-        if not main_pair:
-            main_pair = pairs[0]
+    # Pick the Solana pair with the highest liquidity (usually the main pair).
+    # max() keeps the first of equal values, so with no liquidity data this is
+    # the first Solana pair; without any Solana pair, fall back to the first pair.
+    solana_pairs = [pair for pair in pairs if pair.get("chainId") == "solana"]
+    main_pair = max(solana_pairs, key=_liquidity_usd, default=None) or pairs[0]
     
     # Extract data
     base_token = main_pair.get("baseToken", {})
@@ -142,11 +213,29 @@ def get_live_mcap_and_symbol(contract_address: str) -> Tuple[Optional[str], Opti
     Returns:
         (symbol, mcap_usd, liquidity_usd, price_usd)
     """
+    key = contract_address.lower()
+    now = time.monotonic()
+    cached = _live_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+    
     data = fetch_token_data(contract_address)
     if not data:
+        # Failures are not cached, so the next call retries
         return None, None, None, None
     
-    return extract_token_info(data, contract_address)
+    info = extract_token_info(data, contract_address)
+    _cache_live_info(key, info, now)
+    return info
+
+
+def _cache_live_info(key: str, info: Tuple[Optional[str], Optional[float], Optional[float], Optional[str]], now: float):
+    """Store a lookup result in _live_cache for _LIVE_CACHE_TTL seconds."""
+    _live_cache.pop(key, None)
+    if len(_live_cache) >= _LIVE_CACHE_MAX:
+        # Evict the oldest entry (dicts keep insertion order)
+        _live_cache.pop(next(iter(_live_cache)), None)
+    _live_cache[key] = (now + _LIVE_CACHE_TTL, info)
 
 
 def enrich_alert_with_live_data(alert: Dict) -> Dict:
@@ -163,7 +252,60 @@ def enrich_alert_with_live_data(alert: Dict) -> Dict:
     if not contract:
         return alert
     
-    symbol, mcap, liquidity, price = get_live_mcap_and_symbol(contract)
+    return _apply_live_data(alert, get_live_mcap_and_symbol(contract))
+
+
+def enrich_alerts_bulk(alerts: List[Dict]) -> List[Dict]:
+    """
+    Enrich many alerts at once, fetching each distinct contract in batches of 30.
+    
+    Args:
+        alerts: Alert dictionaries with contract addresses
+        
+    Returns:
+        The same alert dicts, updated like enrich_alert_with_live_data does
+    """
+    # Contracts looked up in the last _LIVE_CACHE_TTL seconds are served from
+    # the same cache get_live_mcap_and_symbol uses; only the rest are fetched
+    now = time.monotonic()
+    info_by_key: Dict[str, Optional[Tuple[Optional[str], Optional[float], Optional[float], Optional[str]]]] = {}
+    missing: List[str] = []
+    for alert in alerts:
+        contract = alert.get("contract")
+        if not contract:
+            continue
+        key = contract.lower()
+        if key in info_by_key:
+            continue
+        cached = _live_cache.get(key)
+        if cached and cached[0] > now:
+            info_by_key[key] = cached[1]
+        else:
+            info_by_key[key] = None
+            missing.append(contract)
+    
+    if missing:
+        data_by_contract = fetch_tokens_batch(missing)
+        for contract in missing:
+            data = data_by_contract.get(contract.lower())
+            if data:
+                # Failures are not cached, so the next call retries
+                info = extract_token_info(data, contract)
+                _cache_live_info(contract.lower(), info, now)
+                info_by_key[contract.lower()] = info
+    
+    for alert in alerts:
+        contract = alert.get("contract")
+        info = info_by_key.get(contract.lower()) if contract else None
+        if info:
+            _apply_live_data(alert, info)
+    
+    return alerts
+
+
+def _apply_live_data(alert: Dict, info: Tuple[Optional[str], Optional[float], Optional[float], Optional[str]]) -> Dict:
+    """Copy (symbol, mcap, liquidity, price) onto alert, skipping missing values."""
+    symbol, mcap, liquidity, price = info
     
     # Update alert with live data (don't overwrite existing if live data is None)
     if symbol:
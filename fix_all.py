@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Run the old-alert MCAP, Telegram MCAP and tier fixes over kpi_logs.json in one pass
+Loads and saves the file once (with a single backup) instead of once per script
+
+--patch leaves kpi_logs.json untouched and writes the edits as a JSON Patch
+(kpi_logs.patch.json); apply it later with kpi_patch.py
+--sidecar instead appends only the new edits to kpi_logs_fixes.jsonl, keyed by
+alert contract + timestamp; readers merge it with kpi_patch.merge_sidecar(), and
+kpi_patch.py folds it into the file
+"""
+
+import sys
+from pathlib import Path
+
+from kpi_io import load_kpi, save_kpi
+from kpi_patch import (PATCH_FILE, SIDECAR_FILE, append_sidecar, diff_alerts, merge_sidecar,
+                       sidecar_entries, snapshot_alerts)
+from fix_old_alerts_mcap import apply_old_alerts
+from fix_mcap_from_telegram_posts import ALERT_FIXES, apply_mcap_fixes
+from fix_tiers_manually import apply_tiers
+
+# Fix Windows console encoding
+if sys.platform == 'win32':
+    try:
+        sys.stdout.reconfigure(encoding='utf-8')
+    except:
+        pass
+
+KPI_LOGS_FILE = Path("kpi_logs.json")
+
+
+def fix_all(verbose: bool = False, patch: bool = False, sidecar: bool = False):
+    """Apply fix_old_alerts, fix_mcap and fix_tiers to one in-memory copy of kpi_logs.json."""
+    print("=" * 80)
+    print("FIXING kpi_logs.json - OLD ALERTS MCAP, TELEGRAM MCAP, TIERS")
+    print("=" * 80)
+
+    if not KPI_LOGS_FILE.exists():
+        print(f"❌ {KPI_LOGS_FILE} not found!")
+        return
+
+    try:
+        data = load_kpi(KPI_LOGS_FILE)
+    except Exception as e:
+        print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
+        return
+
+    if sidecar:
+        # Start from base + pending fixes so only new edits get appended
+        merge_sidecar(data)
+
+    alerts = data.get('alerts', [])
+    print(f"📋 Loaded {len(alerts)} alerts")
+
+    before = snapshot_alerts(alerts) if patch or sidecar else None
+
+    # Same order as running the three scripts one after another
+    print(f"\n🔧 Adding current_mcap to old alerts...")
+    fixed_count, stats = apply_old_alerts(alerts)
+
+    print(f"\n🔧 Applying Telegram MCAP fixes...")
+    mcap_count = apply_mcap_fixes(alerts, ALERT_FIXES)
+
+    print(f"\n🔧 Fixing tiers...")
+    tier_count, tier_distribution, _ = apply_tiers(alerts, verbose)
+
+    if patch:
+        ops = diff_alerts(before, alerts)
+        try:
+            save_kpi(ops, PATCH_FILE)
+            print(f"\n✅ Wrote {len(ops)} patch operation(s) to {PATCH_FILE} ({KPI_LOGS_FILE} left unchanged)")
+        except Exception as e:
+            print(f"❌ Error saving {PATCH_FILE}: {e}")
+            return
+    elif sidecar:
+        entries = sidecar_entries(before, alerts)
+        try:
+            append_sidecar(entries)
+            print(f"\n✅ Appended fixes for {len(entries)} alert(s) to {SIDECAR_FILE} ({KPI_LOGS_FILE} left unchanged)")
+        except Exception as e:
+            print(f"❌ Error saving {SIDECAR_FILE}: {e}")
+            return
+    elif fixed_count or mcap_count or tier_count:
+        try:
+            # The current file becomes the backup; the new one is renamed into place
+            backup_path = KPI_LOGS_FILE.with_suffix('.json.backup_fix_all')
+            save_kpi(data, KPI_LOGS_FILE, backup=backup_path)
+            print(f"\n📦 Backup created: {backup_path}")
+            print(f"✅ Saved to {KPI_LOGS_FILE}")
+        except Exception as e:
+            print(f"❌ Error saving {KPI_LOGS_FILE}: {e}")
+            return
+    else:
+        print(f"\n✅ Nothing to fix - {KPI_LOGS_FILE} left unchanged")
+
+    # Summary
+    print("\n" + "=" * 80)
+    print("SUMMARY")
+    print("=" * 80)
+    print(f"Total alerts: {len(alerts)}")
+    print(f"Added current_mcap: {fixed_count} "
+          f"(live_mcap: {stats['from_live_mcap']}, mc_usd: {stats['from_mc_usd']}, entry_mc: {stats['from_entry_mc']})")
+    print(f"No MCAP data available: {stats['no_data']}")
+    print(f"Telegram MCAP fixes applied: {mcap_count}/{len(ALERT_FIXES)}")
+    print(f"Tiers inferred: {tier_count} "
+          f"(Tier 1: {tier_distribution[1]}, Tier 2: {tier_distribution[2]}, Tier 3: {tier_distribution[3]})")
+
+
+if __name__ == "__main__":
+    fix_all(verbose='--verbose' in sys.argv, patch='--patch' in sys.argv, sidecar='--sidecar' in sys.argv)
@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
 """Fix all wrong timestamps - convert IST to UTC."""
 
-import json
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-import shutil
+
+from kpi_io import iter_alerts, load_kpi, parse_iso, save_kpi
 
 KPI_LOGS_FILE = Path("kpi_logs.json")
 IST_OFFSET = timedelta(hours=5, minutes=30)
@@ -16,17 +16,14 @@ def main():
     print("="*80)
     print()
     
-    with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-        kpi_data = json.load(f)
-    
-    alerts = kpi_data.get("alerts", [])
-    print(f"Found {len(alerts)} alerts")
-    print()
+    now = datetime.now(timezone.utc)  # read the clock once per run
+    fixes = []  # (alert index, corrected timestamp)
+    messages = []
+    alert_count = 0
     
-    now = datetime.now(timezone.utc)
-    fixed_count = 0
-    
-    for alert in alerts:
+    # Scan phase: stream alerts so only the fixes are kept in memory
+    for index, alert in enumerate(iter_alerts(KPI_LOGS_FILE)):
+        alert_count += 1
         # Only fix alerts that were backfilled (they have IST timestamps)
         if alert.get("source") != "telegram_export_backfill":
             continue
@@ -37,7 +34,7 @@ def main():
         
         try:
             # Parse current timestamp
-            current_timestamp = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
+            current_timestamp = parse_iso(timestamp_str)
             if current_timestamp.tzinfo is None:
                 current_timestamp = current_timestamp.replace(tzinfo=timezone.utc)
             else:
@@ -52,30 +49,37 @@ def main():
                 corrected_timestamp = current_timestamp - IST_OFFSET
                 
                 token = alert.get("token", "UNKNOWN")
-                print(f"Fixing {token}:")
-                print(f"  Old: {current_timestamp.isoformat()} (in future by {int(time_diff/3600)}h)")
-                print(f"  New: {corrected_timestamp.isoformat()}")
+                messages.append(f"Fixing {token}:")
+                messages.append(f"  Old: {current_timestamp.isoformat()} (in future by {int(time_diff/3600)}h)")
+                messages.append(f"  New: {corrected_timestamp.isoformat()}")
                 
-                alert["timestamp"] = corrected_timestamp.isoformat()
-                fixed_count += 1
+                fixes.append((index, corrected_timestamp.isoformat()))
         except Exception as e:
-            print(f"Error fixing alert: {e}")
+            messages.append(f"Error fixing alert: {e}")
             continue
     
-    if fixed_count > 0:
-        # Backup
-        backup_file = KPI_LOGS_FILE.with_suffix('.json.backup')
-        shutil.copy2(KPI_LOGS_FILE, backup_file)
-        print(f"\nCreated backup: {backup_file}")
+    print(f"Found {alert_count} alerts")
+    print()
+    for message in messages:
+        print(message)
+    
+    if fixes:
+        # Only now materialize the whole file to patch and save it
+        kpi_data = load_kpi(KPI_LOGS_FILE)
+        alerts = kpi_data.get("alerts", [])
+        for index, corrected in fixes:
+            alerts[index]["timestamp"] = corrected
         
         # Save
         kpi_data["alerts"] = alerts
-        kpi_data["last_updated"] = datetime.now(timezone.utc).isoformat()
+        kpi_data["last_updated"] = now.isoformat()
         
-        with open(KPI_LOGS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(kpi_data, f, indent=2, ensure_ascii=False)
+        # The current file becomes the backup; the new one is renamed into place
+        backup_file = KPI_LOGS_FILE.with_suffix('.json.backup')
+        save_kpi(kpi_data, KPI_LOGS_FILE, backup=backup_file)
+        print(f"\nCreated backup: {backup_file}")
         
-        print(f"\n[SUCCESS] Fixed {fixed_count} alert timestamps (IST -> UTC)")
+        print(f"\n[SUCCESS] Fixed {len(fixes)} alert timestamps (IST -> UTC)")
     else:
         print("\nNo timestamps needed fixing")
 
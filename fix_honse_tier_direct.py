@@ -2,10 +2,12 @@
 # -*- coding: utf-8 -*-
 """Directly fix HONSE tier based on user's correction"""
 
-import json
 import sys
 from pathlib import Path
 
+from kpi_index import index_alerts
+from kpi_io import load_kpi, save_kpi
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     try:
@@ -28,8 +30,7 @@ def fix_honse_tiers():
         return
     
     try:
-        with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_kpi(KPI_LOGS_FILE)
     except Exception as e:
         print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
         return
@@ -37,21 +38,13 @@ def fix_honse_tiers():
     alerts = data.get('alerts', [])
     print(f"\n📋 Loaded {len(alerts)} alerts")
     
-    # Find HONSE alerts
-    honse_alerts = [
-        a for a in alerts 
-        if a.get('token', '').upper() == 'HONSE' 
-        or a.get('contract', '') == HONSE_CONTRACT
-    ]
+    # Find HONSE alerts (by token or contract, kept in file order)
+    by_contract, by_token = index_alerts(alerts)
+    honse_idxs = sorted(set(by_token.get('HONSE', [])).union(by_contract.get(HONSE_CONTRACT, [])))
+    honse_alerts = [alerts[i] for i in honse_idxs]
     
     print(f"\n🔍 Found {len(honse_alerts)} HONSE alerts")
     
-    # Create backup
-    backup_path = KPI_LOGS_FILE.with_suffix('.json.backup3')
-    import shutil
-    shutil.copy2(KPI_LOGS_FILE, backup_path)
-    print(f"📦 Backup created: {backup_path}")
-    
     # Based on user's information:
     # Post 243: Should be Tier 1 (was posted as "TIER 2 LOCKED")
     # Post 239: Correctly Tier 2 (has Glydo Top 5 + 4 confirmations)
@@ -92,8 +85,10 @@ def fix_honse_tiers():
     # Save updated data
     if updated_count > 0:
         try:
-            with open(KPI_LOGS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # The current file becomes the backup; the new one is renamed into place
+            backup_path = KPI_LOGS_FILE.with_suffix('.json.backup3')
+            save_kpi(data, KPI_LOGS_FILE, backup=backup_path)
+            print(f"📦 Backup created: {backup_path}")
             print(f"\n✅ Saved to {KPI_LOGS_FILE}")
             print(f"✅ Updated {updated_count} HONSE alert(s)")
         except Exception as e:
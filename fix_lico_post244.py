@@ -2,12 +2,13 @@
 # -*- coding: utf-8 -*-
 """Fix LICO post 244 - should be Tier 3, not Tier 1"""
 
-import json
 import sys
 from pathlib import Path
-import shutil
 from datetime import datetime, timezone
 
+from kpi_index import index_alerts
+from kpi_io import load_kpi, save_kpi
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     try:
@@ -36,8 +37,7 @@ def fix_lico_post244():
         return
     
     try:
-        with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_kpi(KPI_LOGS_FILE)
     except Exception as e:
         print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
         return
@@ -45,20 +45,13 @@ def fix_lico_post244():
     alerts = data.get('alerts', [])
     print(f"\n📋 Loaded {len(alerts)} alerts")
     
-    # Find LICO alerts
-    lico_alerts = [
-        a for a in alerts 
-        if a.get('token', '').upper() == 'LICO' 
-        and a.get('contract', '') == LICO_CONTRACT
-    ]
+    # Find LICO alerts (token and contract must both match, kept in file order)
+    by_contract, by_token = index_alerts(alerts)
+    lico_idxs = sorted(set(by_token.get('LICO', [])).intersection(by_contract.get(LICO_CONTRACT, [])))
+    lico_alerts = [alerts[i] for i in lico_idxs]
     
     print(f"\n🔍 Found {len(lico_alerts)} LICO alerts")
     
-    # Create backup
-    backup_path = KPI_LOGS_FILE.with_suffix('.json.backup4')
-    shutil.copy2(KPI_LOGS_FILE, backup_path)
-    print(f"📦 Backup created: {backup_path}")
-    
     # Post 244 was posted around 10:50 AM UTC on Dec 26
     # That's approximately 2025-12-26T10:50:00+00:00
     # The alert in JSON is 2025-12-26T02:44:50 (2:44 AM)
@@ -75,39 +68,40 @@ def fix_lico_post244():
     
     updated_count = 0
     
-    for alert in alerts:
-        if alert.get('token', '').upper() == 'LICO' and alert.get('contract') == LICO_CONTRACT:
-            timestamp = alert.get('timestamp', '')
-            current_tier = alert.get('tier')
-            mc_usd = alert.get('mc_usd') or alert.get('entry_mc', 0)
-            
-            print(f"\n  LICO Alert:")
-            print(f"    Timestamp: {timestamp}")
-            print(f"    Current tier: {current_tier}")
-            print(f"    MC: ${mc_usd:,.0f}")
-            
-            # Post 244 has MC: $265.6K
-            # The alert at 02:44:50 has MC: $51.7K
-            # So post 244 is a DIFFERENT alert (newer, higher MC)
-            
-            # Check if this alert matches post 244
-            # Post 244: MC around $265K
-            # Check if this alert matches post 244 by MC
-            if 200000 <= mc_usd <= 300000:
-                # This matches post 244 MC ($265.6K) - should be Tier 3
-                if current_tier != 3:
-                    alert['tier'] = 3
-                    updated_count += 1
-                    print(f"    ✅ Updated to Tier 3 (Post 244 - MC ${mc_usd:,.0f}K matches, Telegram says TIER 3)")
-                else:
-                    print(f"    ✅ Already Tier 3 (Post 244)")
-            elif current_tier == 1 and mc_usd < 100000:
-                # This is the older alert (02:44:50) with MC $51.7K
-                # Post 244 is a DIFFERENT alert (newer, MC $265.6K)
-                # But the API is showing this one because post 244 might not be in JSON yet
-                print(f"    ℹ️  Older alert (MC ${mc_usd:,.0f}K) - this is NOT post 244")
-                print(f"       Post 244 has MC $265.6K and is Tier 3")
-                print(f"       If post 244 is not in JSON, it hasn't been processed yet")
+    # Only the LICO candidates need checking against post 244's MC range
+    for alert in lico_alerts:
+        a_get = alert.get
+        timestamp = a_get('timestamp', '')
+        current_tier = a_get('tier')
+        mc_usd = a_get('mc_usd') or a_get('entry_mc', 0)
+        
+        print(f"\n  LICO Alert:")
+        print(f"    Timestamp: {timestamp}")
+        print(f"    Current tier: {current_tier}")
+        print(f"    MC: ${mc_usd:,.0f}")
+        
+        # Post 244 has MC: $265.6K
+        # The alert at 02:44:50 has MC: $51.7K
+        # So post 244 is a DIFFERENT alert (newer, higher MC)
+        
+        # Check if this alert matches post 244
+        # Post 244: MC around $265K
+        # Check if this alert matches post 244 by MC
+        if 200000 <= mc_usd <= 300000:
+            # This matches post 244 MC ($265.6K) - should be Tier 3
+            if current_tier != 3:
+                alert['tier'] = 3
+                updated_count += 1
+                print(f"    ✅ Updated to Tier 3 (Post 244 - MC ${mc_usd:,.0f}K matches, Telegram says TIER 3)")
+            else:
+                print(f"    ✅ Already Tier 3 (Post 244)")
+        elif current_tier == 1 and mc_usd < 100000:
+            # This is the older alert (02:44:50) with MC $51.7K
+            # Post 244 is a DIFFERENT alert (newer, MC $265.6K)
+            # But the API is showing this one because post 244 might not be in JSON yet
+            print(f"    ℹ️  Older alert (MC ${mc_usd:,.0f}K) - this is NOT post 244")
+            print(f"       Post 244 has MC $265.6K and is Tier 3")
+            print(f"       If post 244 is not in JSON, it hasn't been processed yet")
     
     # If post 244 alert is not in JSON yet, we need to add it
     # But we can't do that without more data from the alert
@@ -134,8 +128,10 @@ def fix_lico_post244():
     # Save updated data
     if updated_count > 0:
         try:
-            with open(KPI_LOGS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # The current file becomes the backup; the new one is renamed into place
+            backup_path = KPI_LOGS_FILE.with_suffix('.json.backup4')
+            save_kpi(data, KPI_LOGS_FILE, backup=backup_path)
+            print(f"📦 Backup created: {backup_path}")
             print(f"\n✅ Saved to {KPI_LOGS_FILE}")
             print(f"✅ Updated {updated_count} LICO alert(s)")
         except Exception as e:
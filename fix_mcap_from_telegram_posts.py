@@ -2,12 +2,13 @@
 # -*- coding: utf-8 -*-
 """Fix MCAP for ZAZU and LARPBALL alerts based on Telegram posts"""
 
-import json
 import sys
 from pathlib import Path
-import shutil
 from datetime import datetime, timezone
 
+from kpi_index import index_alerts
+from kpi_io import load_kpi, save_kpi
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     try:
@@ -37,68 +38,53 @@ ALERT_FIXES = {
     },
 }
 
-def fix_mcap():
-    """Fix MCAP for specific alerts"""
-    print("=" * 80)
-    print("FIXING MCAP FOR ZAZU AND LARPBALL ALERTS")
-    print("=" * 80)
-    
-    if not KPI_LOGS_FILE.exists():
-        print(f"❌ {KPI_LOGS_FILE} not found!")
-        return
-    
-    # Create backup
-    backup_path = KPI_LOGS_FILE.with_suffix('.json.backup6')
-    shutil.copy2(KPI_LOGS_FILE, backup_path)
-    print(f"📦 Backup created: {backup_path}")
-    
-    try:
-        with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
-        return
-    
-    alerts = data.get('alerts', [])
-    print(f"📋 Loaded {len(alerts)} alerts")
-    
+
+def _compile_fixes(fixes):
+    """Flatten a fixes dict into (token, TOKEN, contract, timestamp_pattern, current_mcap, entry_mc) tuples."""
+    return tuple(
+        (d["token"], d["token"].upper(), d["contract"], d["timestamp_pattern"], d["current_mcap"], d.get("entry_mc"))
+        for d in fixes.values()
+    )
+
+
+ALERT_FIXES_COMPILED = _compile_fixes(ALERT_FIXES)
+
+# Bound once instead of parsing the ${:,.0f} spec in every f-string
+_fmt_usd = "${:,.0f}".format
+
+def apply_mcap_fixes(alerts, fixes=ALERT_FIXES, quiet: bool = False) -> int:
+    """Apply the Telegram MCAP fixes to alerts in place and return how many were updated."""
     updated_count = 0
+    lines = []
     
-    for fix_name, fix_data in ALERT_FIXES.items():
-        token = fix_data["token"]
-        contract = fix_data["contract"]
-        timestamp_pattern = fix_data["timestamp_pattern"]
-        new_current_mcap = fix_data["current_mcap"]
-        entry_mc = fix_data.get("entry_mc")
-        
-        print(f"\n🔍 Looking for {token} alert around {timestamp_pattern}...")
+    # Index once so each fix is a lookup instead of a full scan
+    by_contract, by_token = index_alerts(alerts)
+    compiled = ALERT_FIXES_COMPILED if fixes is ALERT_FIXES else _compile_fixes(fixes)
+    
+    for token, token_u, contract, timestamp_pattern, new_current_mcap, entry_mc in compiled:
+        lines.append(f"\n🔍 Looking for {token} alert around {timestamp_pattern}...")
         
         # Find matching alerts - get the LATEST alert for this token/contract
-        matching_alerts = []
-        for alert in alerts:
-            alert_token = alert.get('token', '').upper()
-            alert_contract = alert.get('contract', '')
-            
-            # Match by token and contract
-            if alert_token == token.upper() and alert_contract == contract:
-                matching_alerts.append(alert)
+        token_idxs = set(by_token.get(token_u, ()))
+        matching_alerts = [alerts[i] for i in by_contract.get(contract, ()) if i in token_idxs]
         
         if not matching_alerts:
-            print(f"  ❌ No {token} alerts found")
+            lines.append(f"  ❌ No {token} alerts found")
             continue
         
-        # Sort by timestamp (newest first) and take the latest one
-        matching_alerts.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        alert = matching_alerts[0]  # Latest alert
+        # Take the latest one (first of equal timestamps, as the stable sort did)
+        alert = max(matching_alerts, key=lambda x: x.get('timestamp', ''))
         
         alert_timestamp = alert.get('timestamp', '')
         old_mc_usd = alert.get('mc_usd')
         old_current_mcap = alert.get('current_mcap')
         
-        print(f"  ✅ Found latest {token} alert:")
-        print(f"     Timestamp: {alert_timestamp}")
-        print(f"     Old mc_usd: ${old_mc_usd:,.0f}" if old_mc_usd else "     Old mc_usd: None")
-        print(f"     Old current_mcap: ${old_current_mcap:,.0f}" if old_current_mcap else "     Old current_mcap: None")
+        lines += [
+            f"  ✅ Found latest {token} alert:",
+            f"     Timestamp: {alert_timestamp}",
+            f"     Old mc_usd: {_fmt_usd(old_mc_usd) if old_mc_usd else 'None'}",
+            f"     Old current_mcap: {_fmt_usd(old_current_mcap) if old_current_mcap else 'None'}",
+        ]
         
         # Update current_mcap (this is what was shown in Telegram post)
         alert['current_mcap'] = new_current_mcap
@@ -109,16 +95,49 @@ def fix_mcap():
             alert['entry_mc'] = entry_mc
         
         updated_count += 1
-        print(f"     ✅ Updated:")
-        print(f"        current_mcap: ${new_current_mcap:,.0f}")
-        print(f"        mc_usd: ${new_current_mcap:,.0f}")
+        new_mcap_str = _fmt_usd(new_current_mcap)
+        lines += [
+            "     ✅ Updated:",
+            f"        current_mcap: {new_mcap_str}",
+            f"        mc_usd: {new_mcap_str}",
+        ]
         if entry_mc is not None:
-            print(f"        entry_mc: ${entry_mc:,.0f}")
+            lines.append(f"        entry_mc: {_fmt_usd(entry_mc)}")
+    
+    # One console write for the whole report (--quiet skips it)
+    if lines and not quiet:
+        sys.stdout.write('\n'.join(lines) + '\n')
+    
+    return updated_count
+
+
+def fix_mcap(quiet: bool = False):
+    """Fix MCAP for specific alerts (quiet skips the per-fix details)"""
+    print("=" * 80)
+    print("FIXING MCAP FOR ZAZU AND LARPBALL ALERTS")
+    print("=" * 80)
+    
+    if not KPI_LOGS_FILE.exists():
+        print(f"❌ {KPI_LOGS_FILE} not found!")
+        return
+    
+    try:
+        data = load_kpi(KPI_LOGS_FILE)
+    except Exception as e:
+        print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
+        return
+    
+    alerts = data.get('alerts', [])
+    print(f"📋 Loaded {len(alerts)} alerts")
+    
+    updated_count = apply_mcap_fixes(alerts, quiet=quiet)
     
     if updated_count > 0:
         try:
-            with open(KPI_LOGS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # The current file becomes the backup; the new one is renamed into place
+            backup_path = KPI_LOGS_FILE.with_suffix('.json.backup6')
+            save_kpi(data, KPI_LOGS_FILE, backup=backup_path)
+            print(f"📦 Backup created: {backup_path}")
             print(f"\n✅ Saved to {KPI_LOGS_FILE}")
             print(f"✅ Updated {updated_count} alert(s)")
         except Exception as e:
@@ -128,5 +147,5 @@ def fix_mcap():
         print(f"\n⚠️  No matching alerts found to update")
 
 if __name__ == "__main__":
-    fix_mcap()
+    fix_mcap(quiet='--quiet' in sys.argv)
 
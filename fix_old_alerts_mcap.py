@@ -5,12 +5,12 @@ Fix old alerts in kpi_logs.json by adding current_mcap field
 Uses mc_usd or entry_mc as fallback for historical alerts
 """
 
-import json
 import sys
 from pathlib import Path
-import shutil
 from datetime import datetime, timezone
 
+from kpi_io import load_kpi, save_kpi
+
 # Fix Windows console encoding
 if sys.platform == 'win32':
     try:
@@ -20,68 +20,43 @@ if sys.platform == 'win32':
 
 KPI_LOGS_FILE = Path("kpi_logs.json")
 
-def fix_old_alerts():
-    """Add current_mcap field to old alerts that are missing it."""
-    print("=" * 80)
-    print("FIXING OLD ALERTS - ADDING current_mcap FIELD")
-    print("=" * 80)
-    
-    if not KPI_LOGS_FILE.exists():
-        print(f"❌ {KPI_LOGS_FILE} not found!")
-        return
-    
-    # Create backup
-    backup_path = KPI_LOGS_FILE.with_suffix('.json.backup7')
-    shutil.copy2(KPI_LOGS_FILE, backup_path)
-    print(f"📦 Backup created: {backup_path}")
-    
-    try:
-        with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
-        return
-    
-    alerts = data.get('alerts', [])
-    print(f"📋 Loaded {len(alerts)} alerts")
-    
+def apply_old_alerts(alerts):
+    """Fill current_mcap in place from live_mcap/mc_usd/entry_mc; returns (fixed_count, stats)."""
     fixed_count = 0
-    stats = {
-        'from_mc_usd': 0,
-        'from_entry_mc': 0,
-        'from_live_mcap': 0,
-        'already_has': 0,
-        'no_data': 0
-    }
+    # Plain int counters in the loop; the stats dict is only built for the summary
+    from_mc_usd = from_entry_mc = from_live_mcap = already_has = no_data = 0
     
     for alert in alerts:
+        a_get = alert.get
+        
         # Check if current_mcap already exists
-        if alert.get('current_mcap') is not None:
-            stats['already_has'] += 1
+        if a_get('current_mcap') is not None:
+            already_has += 1
             continue
         
         # Try to get current_mcap from available fields
         # Priority: live_mcap > mc_usd > entry_mc
+        live_mcap, mc_usd, entry_mc = a_get('live_mcap'), a_get('mc_usd'), a_get('entry_mc')
         current_mcap = None
         source = None
         
         # First try live_mcap (from DexScreener)
-        if alert.get('live_mcap') is not None:
-            current_mcap = alert.get('live_mcap')
+        if live_mcap is not None:
+            current_mcap = live_mcap
             source = 'live_mcap'
-            stats['from_live_mcap'] += 1
+            from_live_mcap += 1
         
         # Then try mc_usd (this is usually the MCAP that was shown)
-        elif alert.get('mc_usd') is not None:
-            current_mcap = alert.get('mc_usd')
+        elif mc_usd is not None:
+            current_mcap = mc_usd
             source = 'mc_usd'
-            stats['from_mc_usd'] += 1
+            from_mc_usd += 1
         
         # Finally try entry_mc (MCAP when alert was triggered)
-        elif alert.get('entry_mc') is not None:
-            current_mcap = alert.get('entry_mc')
+        elif entry_mc is not None:
+            current_mcap = entry_mc
             source = 'entry_mc'
-            stats['from_entry_mc'] += 1
+            from_entry_mc += 1
         
         # If we found a value, add it
         if current_mcap is not None:
@@ -89,15 +64,48 @@ def fix_old_alerts():
             alert['current_mcap_source'] = source  # Track where it came from
             fixed_count += 1
         else:
-            stats['no_data'] += 1
-            token = alert.get('token', 'UNKNOWN')
-            timestamp = alert.get('timestamp', 'N/A')
+            no_data += 1
+            token = a_get('token', 'UNKNOWN')
+            timestamp = a_get('timestamp', 'N/A')
             print(f"⚠️ No MCAP data for {token} at {timestamp}")
     
+    stats = {
+        'from_mc_usd': from_mc_usd,
+        'from_entry_mc': from_entry_mc,
+        'from_live_mcap': from_live_mcap,
+        'already_has': already_has,
+        'no_data': no_data
+    }
+    
+    return fixed_count, stats
+
+def fix_old_alerts():
+    """Add current_mcap field to old alerts that are missing it."""
+    print("=" * 80)
+    print("FIXING OLD ALERTS - ADDING current_mcap FIELD")
+    print("=" * 80)
+    
+    if not KPI_LOGS_FILE.exists():
+        print(f"❌ {KPI_LOGS_FILE} not found!")
+        return
+    
+    try:
+        data = load_kpi(KPI_LOGS_FILE)
+    except Exception as e:
+        print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
+        return
+    
+    alerts = data.get('alerts', [])
+    print(f"📋 Loaded {len(alerts)} alerts")
+    
+    fixed_count, stats = apply_old_alerts(alerts)
+    
     if fixed_count > 0:
         try:
-            with open(KPI_LOGS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # The current file becomes the backup; the new one is renamed into place
+            backup_path = KPI_LOGS_FILE.with_suffix('.json.backup7')
+            save_kpi(data, KPI_LOGS_FILE, backup=backup_path)
+            print(f"📦 Backup created: {backup_path}")
             print(f"\n✅ Saved to {KPI_LOGS_FILE}")
         except Exception as e:
             print(f"❌ Error saving {KPI_LOGS_FILE}: {e}")
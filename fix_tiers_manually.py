@@ -2,12 +2,14 @@
 # -*- coding: utf-8 -*-
 """Manually fix tier field in kpi_logs.json using heuristics from API server"""
 
-import json
 import sys
 from pathlib import Path
-from collections import defaultdict
+from functools import lru_cache
+from typing import Optional
 from datetime import datetime, timezone
 
+from kpi_io import load_kpi, save_kpi
+
 # Fix Windows console encoding for emojis
 if sys.platform == 'win32':
     try:
@@ -18,96 +20,91 @@ if sys.platform == 'win32':
 KPI_LOGS_FILE = Path("kpi_logs.json")
 
 
-def get_tier_from_level(level: str, alert_tier: int = None, alert_data: dict = None) -> int:
-    """Convert alert level to tier number using same logic as API server."""
-    # If tier is explicitly provided, use it
-    if alert_tier is not None and alert_tier in [1, 2, 3]:
-        return alert_tier
-    
+# Explicit tier strings (upper-cased level -> tier)
+_EXPLICIT_TIERS = {
+    "ULTRA": 1, "TIER 1": 1, "TIER1": 1, "1": 1,
+    "TIER 2": 2, "TIER2": 2, "2": 2,
+    "TIER 3": 3, "TIER3": 3, "3": 3,
+}
+
+
+@lru_cache(maxsize=64)
+def _tier_for_level(level: str) -> Optional[int]:
+    """Tier implied by the level string alone, or None when MEDIUM needs the alert data."""
     level_upper = level.upper()
     
-    # Explicit tier strings
-    if level_upper in ["ULTRA", "TIER 1", "TIER1", "1"]:
-        return 1
-    elif level_upper in ["TIER 2", "TIER2", "2"]:
-        return 2
-    elif level_upper in ["TIER 3", "TIER3", "3"]:
-        return 3
+    tier = _EXPLICIT_TIERS.get(level_upper)
+    if tier is not None:
+        return tier
     
     # CRITICAL: Tier 1 alerts are stored as level="HIGH"
     if "HIGH" in level_upper:
         return 1  # Tier 1 uses HIGH
     
-    # PROBLEM: Both Tier 2 and Tier 3 use MEDIUM level
-    # We need to use heuristics to distinguish them when tier field is missing
-    elif "MEDIUM" in level_upper:
-        if alert_data:
-            # Try to infer tier from alert data
-            # Tier 2: Has Glydo top 5 + confirmations
-            # Tier 3: No Glydo top 5 OR delayed Glydo OR multiple non-Glydo confirmations
-            
-            glydo_in_top5 = alert_data.get("glydo_in_top5", False)
-            hot_list = alert_data.get("hot_list")
-            if isinstance(hot_list, dict):
-                was_in_hot_list = hot_list.get("was_in_hot_list", False)
-            else:
-                was_in_hot_list = bool(hot_list)
-            
-            # If has Glydo top 5, more likely Tier 2
-            if glydo_in_top5 or was_in_hot_list:
-                # Check confirmations - Tier 2 needs at least 1 confirmation
-                confirmations = alert_data.get("confirmations", {})
-                if isinstance(confirmations, dict):
-                    total_confirmations = confirmations.get("total", 0)
-                    strong_confirmations = confirmations.get("strong_total", 0)
-                    if total_confirmations >= 1 or strong_confirmations >= 1:
-                        return 2  # Tier 2: Glydo top 5 + confirmations
-            
-            # Default MEDIUM to Tier 3 (more common, and safer default)
-            return 3
-        
-        # No alert data available - default MEDIUM to Tier 3
-        return 3
+    if "MEDIUM" in level_upper:
+        return None
     
     return 3  # Default to tier 3
 
 
-def fix_tiers():
-    """Fix tier field in kpi_logs.json using heuristics."""
-    print("=" * 80)
-    print("FIXING TIER FIELD IN kpi_logs.json")
-    print("=" * 80)
-    
-    # Load kpi_logs
-    if not KPI_LOGS_FILE.exists():
-        print(f"❌ {KPI_LOGS_FILE} not found!")
-        return
+def get_tier_from_level(level: str, alert_tier: int = None, alert_data: dict = None) -> int:
+    """Convert alert level to tier number using same logic as API server."""
+    # If tier is explicitly provided, use it
+    if alert_tier is not None and alert_tier in (1, 2, 3):
+        return alert_tier
     
-    try:
-        with open(KPI_LOGS_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
-        return
+    # Levels are a handful of repeated strings, so this is almost always a cache hit
+    tier = _tier_for_level(level)
+    if tier is not None:
+        return tier
     
-    alerts = data.get('alerts', [])
-    print(f"\n📋 Loaded {len(alerts)} alerts")
+    # PROBLEM: Both Tier 2 and Tier 3 use MEDIUM level
+    # We need to use heuristics to distinguish them when tier field is missing
+    if alert_data:
+        # Try to infer tier from alert data
+        # Tier 2: Has Glydo top 5 + confirmations
+        # Tier 3: No Glydo top 5 OR delayed Glydo OR multiple non-Glydo confirmations
+        
+        glydo_in_top5 = alert_data.get("glydo_in_top5", False)
+        hot_list = alert_data.get("hot_list")
+        if isinstance(hot_list, dict):
+            was_in_hot_list = hot_list.get("was_in_hot_list", False)
+        else:
+            was_in_hot_list = bool(hot_list)
+        
+        # If has Glydo top 5, more likely Tier 2
+        if glydo_in_top5 or was_in_hot_list:
+            # Check confirmations - Tier 2 needs at least 1 confirmation
+            confirmations = alert_data.get("confirmations", {})
+            if isinstance(confirmations, dict):
+                total_confirmations = confirmations.get("total", 0)
+                strong_confirmations = confirmations.get("strong_total", 0)
+                if total_confirmations >= 1 or strong_confirmations >= 1:
+                    return 2  # Tier 2: Glydo top 5 + confirmations
+        
+        # Default MEDIUM to Tier 3 (more common, and safer default)
+        return 3
     
-    # Create backup
-    backup_path = KPI_LOGS_FILE.with_suffix('.json.backup')
-    import shutil
-    shutil.copy2(KPI_LOGS_FILE, backup_path)
-    print(f"📦 Backup created: {backup_path}")
+    # No alert data available - default MEDIUM to Tier 3
+    return 3
+
+
+def apply_tiers(alerts, verbose: bool = False):
+    """
+    Infer the tier of alerts that lack one, in place.
     
+    Returns (updated_count, tier_distribution by tier index, already_had_tier).
+    """
     # Fix tiers
     updated_count = 0
-    tier_distribution = defaultdict(int)
-    
-    print(f"\n🔧 Fixing tiers...")
+    already_had_tier = 0
+    tier_distribution = [0, 0, 0, 0]  # indexed by tier; get_tier_from_level only returns 1-3
+    lines = []
     
     for alert in alerts:
         # Skip if tier already exists
         if alert.get('tier') is not None:
+            already_had_tier += 1
             continue
         
         # Get level
@@ -121,13 +118,46 @@ def fix_tiers():
         tier_distribution[tier] += 1
         updated_count += 1
         
-        token = alert.get('token', 'UNKNOWN')
-        print(f"  ✅ {token}: level={level} → tier={tier}")
+        if verbose:
+            token = alert.get('token', 'UNKNOWN')
+            lines.append(f"  ✅ {token}: level={level} → tier={tier}")
+    
+    # One console write for the whole list instead of a print per alert
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+    
+    return updated_count, tier_distribution, already_had_tier
+
+
+def fix_tiers(verbose: bool = False):
+    """Fix tier field in kpi_logs.json using heuristics (verbose lists every updated alert)."""
+    print("=" * 80)
+    print("FIXING TIER FIELD IN kpi_logs.json")
+    print("=" * 80)
+    
+    # Load kpi_logs
+    if not KPI_LOGS_FILE.exists():
+        print(f"❌ {KPI_LOGS_FILE} not found!")
+        return
+    
+    try:
+        data = load_kpi(KPI_LOGS_FILE)
+    except Exception as e:
+        print(f"❌ Error loading {KPI_LOGS_FILE}: {e}")
+        return
+    
+    alerts = data.get('alerts', [])
+    print(f"\n📋 Loaded {len(alerts)} alerts")
+    
+    print(f"\n🔧 Fixing tiers...")
+    updated_count, tier_distribution, already_had_tier = apply_tiers(alerts, verbose)
     
     # Save updated data
     try:
-        with open(KPI_LOGS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # The current file becomes the backup; the new one is renamed into place
+        backup_path = KPI_LOGS_FILE.with_suffix('.json.backup')
+        save_kpi(data, KPI_LOGS_FILE, backup=backup_path)
+        print(f"📦 Backup created: {backup_path}")
         print(f"\n✅ Saved to {KPI_LOGS_FILE}")
     except Exception as e:
         print(f"❌ Error saving {KPI_LOGS_FILE}: {e}")
@@ -142,11 +172,11 @@ def fix_tiers():
     print(f"  Tier 1: {tier_distribution[1]}")
     print(f"  Tier 2: {tier_distribution[2]}")
     print(f"  Tier 3: {tier_distribution[3]}")
-    print(f"  Total: {sum(tier_distribution.values())}")
+    print(f"  Total: {sum(tier_distribution)}")
     
-    # Verify
-    alerts_with_tier = [a for a in alerts if a.get('tier') is not None]
-    print(f"\n✅ Alerts with tier field: {len(alerts_with_tier)}/{len(alerts)} ({len(alerts_with_tier)/len(alerts)*100:.1f}%)")
+    # Verify (counted during the fix pass instead of rescanning the alerts)
+    alerts_with_tier = already_had_tier + updated_count
+    print(f"\n✅ Alerts with tier field: {alerts_with_tier}/{len(alerts)} ({alerts_with_tier/len(alerts)*100:.1f}%)")
     
     print(f"\n💡 Note: Tiers were inferred using heuristics:")
     print(f"   - HIGH level → Tier 1")
@@ -156,5 +186,5 @@ def fix_tiers():
 
 
 if __name__ == "__main__":
-    fix_tiers()
+    fix_tiers(verbose='--verbose' in sys.argv)
 
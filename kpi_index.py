@@ -0,0 +1,105 @@
+"""
+kpi_index.py
+
+Shared, cached index over kpi_logs.json for the check_* scripts:
+- alerts in file order
+- first alert per contract
+- alerts per token (upper-cased symbol, file order)
+- alerts sorted newest first by timestamp
+
+Pending kpi_logs_fixes.jsonl fixes (fix_all.py --sidecar) are merged into the index.
+index_alerts() builds position-based lookups for scripts that edit alerts in place.
+shorten() truncates contracts and other long ids for the scripts' report lines.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from kpi_io import load_kpi
+from kpi_patch import SIDECAR_FILE, merge_sidecar
+
+KPI_LOGS_FILE = "kpi_logs.json"
+
+
+def _timestamp(alert: Dict[str, Any]) -> str:
+    return alert.get('timestamp', '')
+
+
+@dataclass
+class KpiIndex:
+    alerts: List[Dict[str, Any]]
+    by_contract: Dict[str, Dict[str, Any]]
+    by_token: Dict[str, List[Dict[str, Any]]]
+    latest_alert: Optional[Dict[str, Any]]
+
+    @cached_property
+    def by_time(self) -> List[Dict[str, Any]]:
+        # Stable sort, so ties keep file order like max()/heapq.nlargest() did
+        return sorted(self.alerts, key=_timestamp, reverse=True)
+
+    def latest(self, n: int = 1) -> List[Dict[str, Any]]:
+        """Return the n newest alerts (ISO timestamps compare correctly as strings)."""
+        if n == 1:
+            return [self.latest_alert] if self.latest_alert is not None else []
+        # Partial selection instead of sorting every alert; by_time is for callers needing the full order
+        return heapq.nlargest(n, self.alerts, key=_timestamp)
+
+
+@lru_cache(maxsize=4)
+def _load(path: str, mtime_ns: int, size: int, sidecar_stat: Tuple[int, int]) -> KpiIndex:
+    # mtime_ns/size/sidecar_stat are only part of the cache key: a rewritten file
+    # or a grown sidecar gets a fresh index
+    data = load_kpi(path)
+    if sidecar_stat != (0, 0):
+        merge_sidecar(data, _sidecar_path(path))
+    alerts = data.get('alerts', [])
+
+    by_contract: Dict[str, Dict[str, Any]] = {}
+    by_token: Dict[str, List[Dict[str, Any]]] = {}
+    latest_ts = ''
+    latest_alert = None
+    for alert in alerts:
+        by_contract.setdefault(alert.get('contract'), alert)
+        by_token.setdefault((alert.get('token') or '').upper(), []).append(alert)
+        # Track the newest alert in the same pass; the first of equal timestamps wins, as with max()
+        ts = alert.get('timestamp', '')
+        if latest_alert is None or ts > latest_ts:
+            latest_ts = ts
+            latest_alert = alert
+
+    return KpiIndex(alerts=alerts, by_contract=by_contract, by_token=by_token, latest_alert=latest_alert)
+
+
+def index_alerts(alerts: List[Dict[str, Any]]) -> Tuple[Dict[str, List[int]], Dict[str, List[int]]]:
+    """Map contract -> alert positions and upper-cased token -> alert positions in one pass."""
+    by_contract: Dict[str, List[int]] = {}
+    by_token: Dict[str, List[int]] = {}
+    for i, alert in enumerate(alerts):
+        by_contract.setdefault(alert.get('contract', ''), []).append(i)
+        by_token.setdefault((alert.get('token') or '').upper(), []).append(i)
+    return by_contract, by_token
+
+
+def shorten(s: Optional[str], n: int = 20) -> str:
+    """Truncate s to n characters plus '...' for display ('N/A' when empty)."""
+    return f"{s[:n]}..." if s and len(s) > n else (s or "N/A")
+
+
+def _sidecar_path(path: str | os.PathLike) -> str:
+    return os.path.join(os.path.dirname(os.fspath(path)), SIDECAR_FILE.name)
+
+
+def get_index(path: str | os.PathLike = KPI_LOGS_FILE) -> KpiIndex:
+    """Return the index for path, rebuilding it only when the file or its sidecar has changed."""
+    st = os.stat(path)
+    try:
+        sc = os.stat(_sidecar_path(path))
+        sidecar_stat = (sc.st_mtime_ns, sc.st_size)
+    except FileNotFoundError:
+        sidecar_stat = (0, 0)
+    return _load(os.fspath(path), st.st_mtime_ns, st.st_size, sidecar_stat)
@@ -0,0 +1,190 @@
+"""
+kpi_io.py
+
+Load/save helpers for kpi_logs.json, using orjson when available and
+stdlib json otherwise. Both writers produce the same indented layout and
+the same values; float spelling can differ (orjson writes 1e16, json 1e+16).
+NaN/Infinity are not valid JSON and orjson.loads rejects them, so both
+writers store them as null.
+iter_alerts() streams the alerts list for read-only scripts, and parse_iso() is
+the one ISO timestamp parser the scripts share.
+Also shared JSON lines helpers for the append-only files next to it.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import mmap
+import os
+import shutil
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    from ciso8601 import parse_datetime as _parse_datetime
+    CISO8601_AVAILABLE = True
+except ImportError:
+    CISO8601_AVAILABLE = False
+
+KPI_LOGS_FILE = Path("kpi_logs.json")
+
+# kpi_logger writes indented JSON and the file is tracked in git, so indentation
+# stays the default; KPI_LOGS_COMPACT=1 opts into smaller, faster compact output.
+COMPACT_JSON = os.getenv("KPI_LOGS_COMPACT") == "1"
+
+
+def load_kpi(path: str | os.PathLike = KPI_LOGS_FILE) -> Dict[str, Any]:
+    """Parse kpi_logs.json and return the top-level dict."""
+    if ORJSON_AVAILABLE:
+        # Parse straight from the page cache instead of copying the file into memory
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+    # One read into a contiguous buffer; json.loads detects UTF-8 on bytes itself
+    return json.loads(Path(path).read_bytes())
+
+
+def iter_alerts(path: str | os.PathLike = KPI_LOGS_FILE) -> Iterator[Dict[str, Any]]:
+    """Yield alerts from kpi_logs.json, streaming them with ijson when available."""
+    if IJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            yield from ijson.items(f, 'alerts.item', use_float=True)
+        return
+    yield from load_kpi(path).get('alerts', [])
+
+
+@lru_cache(maxsize=4096)
+def parse_iso(ts: str) -> datetime:
+    """
+    Parse an ISO 8601 timestamp (a trailing 'Z' is accepted), once per distinct string.
+    
+    Uses the ciso8601 C parser when installed; otherwise fixed-width UTC strings
+    (what isoformat() writes) are sliced directly and the rest go to fromisoformat().
+    """
+    if CISO8601_AVAILABLE:
+        return _parse_datetime(ts)
+    # "2026-01-03T12:36:51Z" / "2026-01-03T12:36:51+00:00"
+    n = len(ts)
+    if (n == 20 and ts[19] == "Z") or (n == 25 and ts.endswith("+00:00")):
+        if ts[4] == "-" and ts[7] == "-" and ts[10] == "T" and ts[13] == ":" and ts[16] == ":":
+            try:
+                return datetime(int(ts[0:4]), int(ts[5:7]), int(ts[8:10]),
+                                int(ts[11:13]), int(ts[14:16]), int(ts[17:19]),
+                                tzinfo=timezone.utc)
+            except ValueError:
+                pass
+    # Python < 3.11 fromisoformat() does not accept a trailing 'Z'
+    return datetime.fromisoformat(ts[:-1] + "+00:00" if ts.endswith("Z") else ts)
+
+
+def _finite(obj: Any) -> Any:
+    """Copy of obj with NaN/Infinity replaced by None, as orjson.dumps writes them."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def dumps_kpi(data: Dict[str, Any], compact: Optional[bool] = None) -> bytes:
+    """
+    Encode data as UTF-8 bytes, laid out like json.dumps(indent=2, ensure_ascii=False).
+    
+    Not byte-identical to it: NaN/Infinity become null on both the orjson and the
+    stdlib path, and large/small floats may be spelled differently (1e16 vs 1e+16).
+    compact=True (default: KPI_LOGS_COMPACT) skips indentation entirely.
+    """
+    if compact is None:
+        compact = COMPACT_JSON
+    
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS if compact else orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+        try:
+            return orjson.dumps(data, option=option)
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bits - stdlib json can still encode those
+    data = _finite(data)
+    if compact:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'), allow_nan=False).encode('utf-8')
+    return json.dumps(data, indent=2, ensure_ascii=False, allow_nan=False).encode('utf-8')
+
+
+def save_kpi(data: Dict[str, Any], path: str | os.PathLike = KPI_LOGS_FILE,
+             backup: Optional[str | os.PathLike] = None, compact: Optional[bool] = None) -> None:
+    """
+    Write data in the dumps_kpi() layout (json.dump(indent=2, ensure_ascii=False)), atomically.
+    
+    The new content goes to a temp file first. If backup is given, it becomes a
+    hardlink to the current file (no data copied); renaming the temp file into
+    place then leaves the backup pointing at the old content.
+    """
+    payload = dumps_kpi(data, compact)
+    
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_bytes(payload)
+    if backup is not None and path.exists():
+        backup = Path(backup)
+        try:
+            backup.unlink(missing_ok=True)
+            os.link(path, backup)
+        except OSError:
+            # Filesystem without hardlink support - fall back to a real copy
+            shutil.copy2(path, backup)
+    os.replace(tmp_path, path)
+
+
+def _dumps_line(record: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS) + b'\n'
+        except orjson.JSONEncodeError:
+            pass
+    return (json.dumps(_finite(record), ensure_ascii=False, allow_nan=False) + '\n').encode('utf-8')
+
+
+def append_jsonl(records: Iterable[Any], path: str | os.PathLike, fsync: bool = False) -> None:
+    """Append records as JSON lines in one write; fsync=True makes them durable before returning."""
+    payload = b''.join(_dumps_line(record) for record in records)
+    with open(path, 'ab') as f:
+        f.write(payload)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def read_jsonl(path: str | os.PathLike) -> List[Any]:
+    """Records from a JSON lines file, oldest first ([] if it doesn't exist)."""
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return []
+    loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+    records = []
+    for line in raw.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(loads(line))
+        except ValueError:
+            # Torn line from a crash or failed write mid-append; the records around it are intact
+            continue
+    return records
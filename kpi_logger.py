@@ -9,12 +9,86 @@ Tracks precision, recall, false positives, and alert metrics.
 
 from __future__ import annotations
 
+import atexit
 import json
+import os
+import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 from collections import defaultdict
 
+from kpi_io import append_jsonl, dumps_kpi, load_kpi, parse_iso, read_jsonl
+
+# New records are fsync'd to an append-only journal (kpi_logs.jsonl) first, so logging an
+# alert no longer rewrites the whole file; a background thread then folds bursts of records
+# into a single kpi_logs.json snapshot this many seconds later.
+SNAPSHOT_DELAY = float(os.getenv("KPI_SNAPSHOT_DELAY", "1.0"))
+
+# Backups of kpi_logs.json: a fixed ring of slots (backups/kpi_logs.bak0.json ...), refreshed
+# at most once per interval instead of on every save
+BACKUP_SLOTS = 5
+BACKUP_INTERVAL = float(os.getenv("KPI_BACKUP_INTERVAL", "300"))
+
+# Journal record kind -> KPILogger list it belongs to
+_JOURNAL_LISTS = {"alert": "alerts", "fp": "false_positives", "tp": "true_positives"}
+
+# Tags counted in the get_daily_stats false positive breakdown
+_FP_TAG_CATEGORIES = frozenset(("no_ca", "low_liq", "has_sb1", "has_glydo", "tiny_buy", "weak_social"))
+
+
+# Values derived from other fields for in-memory use only. They are never written to
+# kpi_logs.json or the journal, and are recomputed on load, so scripts that rewrite
+# timestamps in the file can't leave stale copies behind
+_DERIVED_FIELDS = frozenset(("_ts_epoch", "_marked_at_epoch",
+                             # Tier 2 flags that older versions stored at ingest
+                             "_has_glydo", "_hot_yes", "_confs"))
+
+
+def _persisted(entry: Dict) -> Dict:
+    """entry without its _DERIVED_FIELDS, as written to disk."""
+    return {k: v for k, v in entry.items() if k not in _DERIVED_FIELDS}
+
+
+def _epoch(ts: str) -> float:
+    """Epoch seconds for an ISO timestamp, as get_daily_stats used to compute per call.
+    
+    Unparseable timestamps map to 0.0, so they never count as recent.
+    """
+    try:
+        return parse_iso(ts).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def tier2_signal_flags(alert: Dict) -> Dict[str, Any]:
+    """Tier 2 signals (Glydo, Hot List, confirmations), computed once per alert.
+    
+    Derived from the current glydo_in_top5/hot_list/matched_signals/confirmations on
+    every call, never stored, so later fixes to those fields are always reflected.
+    """
+    hot_list = alert.get("hot_list")
+    hot_str = str(hot_list).lower() if hot_list is not None else ""
+    has_glydo = bool(
+        alert.get("glydo_in_top5")
+        or "glydo" in hot_str
+        or "glydo" in str(alert.get("matched_signals", [])).lower()
+    )
+    hot_yes = bool(hot_list and ("yes" in hot_str or "🟢" in hot_str or hot_list is True))
+    
+    # confirmations is normally a dict; anything else (None, int, list) counts as 0
+    confs = 0
+    confirmations = alert.get("confirmations")
+    if confirmations is not None:
+        try:
+            confs = confirmations.get("total", 0)
+        except AttributeError:
+            pass
+    
+    return {"_has_glydo": has_glydo, "_hot_yes": hot_yes, "_confs": confs}
+
+
 class KPILogger:
     """Track KPIs for live monitoring system."""
     
@@ -65,8 +139,21 @@ class KPILogger:
         self.alerts: List[Dict] = []
         self.false_positives: List[Dict] = []
         self.true_positives: List[Dict] = []
+        
+        self.journal_file = self.log_file.with_suffix('.jsonl')
+        self._journal_seq = 0
+        self._lock = threading.RLock()
+        self._snapshot_pending = threading.Event()
+        self._backup_slot: Optional[int] = None
+        self._last_backup_time: Optional[float] = None
         self.load_logs()
         
+        # Records replayed from the journal get folded into the next snapshot
+        if self.journal_file.exists():
+            self._snapshot_pending.set()
+        threading.Thread(target=self._snapshot_worker, name="kpi-snapshot", daemon=True).start()
+        atexit.register(self.flush)
+        
         # Track alerts for periodic Git sync
         self.alert_count_since_last_sync = 0
         self.last_git_sync_time = datetime.now(timezone.utc)
@@ -81,26 +168,77 @@ class KPILogger:
             self.check_for_gaps()
     
     def load_logs(self):
-        """Load existing logs from file."""
+        """Load existing logs from file, then replay journal records the snapshot doesn't have yet."""
+        snapshot_seq = 0
         if self.log_file.exists():
             try:
-                data = json.loads(self.log_file.read_text())
+                data = load_kpi(self.log_file)
                 self.alerts = data.get("alerts", [])
                 self.false_positives = data.get("false_positives", [])
                 self.true_positives = data.get("true_positives", [])
+                snapshot_seq = data.get("journal_seq", 0)
             except Exception:
                 pass
+        
+        self._journal_seq = snapshot_seq
+        for record in read_jsonl(self.journal_file):
+            seq = record.get("seq", 0)
+            if seq > snapshot_seq:
+                getattr(self, _JOURNAL_LISTS[record["k"]]).append(record["v"])
+            self._journal_seq = max(self._journal_seq, seq)
+        
+        # Parse timestamps once per load so get_daily_stats only compares floats
+        for a in self.alerts:
+            a["_ts_epoch"] = _epoch(a.get("timestamp"))
+        for entry in self.false_positives + self.true_positives:
+            entry["_marked_at_epoch"] = _epoch(entry.get("marked_at"))
+    
+    def _append_record(self, kind: str, entry: Dict):
+        """Durably journal one record (fsync'd), then add it to its in-memory list.
+        
+        Both happen under the lock so a snapshot never holds a record its journal_seq doesn't cover.
+        """
+        with self._lock:
+            self._journal_seq += 1
+            append_jsonl([{"seq": self._journal_seq, "k": kind, "v": _persisted(entry)}], self.journal_file, fsync=True)
+            getattr(self, _JOURNAL_LISTS[kind]).append(entry)
+        self._snapshot_pending.set()
+    
+    def _snapshot_worker(self):
+        while True:
+            self._snapshot_pending.wait()
+            time.sleep(SNAPSHOT_DELAY)  # let a burst of records land in the same snapshot
+            if not self._snapshot_pending.is_set():
+                continue  # someone saved in the meantime
+            try:
+                self.save_logs()
+            except Exception as e:
+                # Still pending, so it is retried; the records are safe in the journal meanwhile
+                print(f"⚠️  Warning: Snapshot of {self.log_file} failed, will retry: {e}")
+    
+    def flush(self):
+        """Write the snapshot now if journaled records are waiting for it."""
+        if self._snapshot_pending.is_set():
+            self.save_logs()
     
     def save_logs(self):
+        """Write a full kpi_logs.json snapshot and drop the journal records it now contains."""
+        with self._lock:
+            self._write_snapshot()
+            self._snapshot_pending.clear()
+            self.journal_file.unlink(missing_ok=True)
+    
+    def _write_snapshot(self):
         """Save logs to file with atomic write, error handling, and automatic backups."""
         data = {
-            "alerts": self.alerts,
-            "false_positives": self.false_positives,
-            "true_positives": self.true_positives,
+            "alerts": [_persisted(a) for a in self.alerts],
+            "false_positives": [_persisted(fp) for fp in self.false_positives],
+            "true_positives": [_persisted(tp) for tp in self.true_positives],
             "last_updated": datetime.now(timezone.utc).isoformat(),
+            "journal_seq": self._journal_seq,
         }
         
-        # CRITICAL: Create backup before writing (keep last 5 backups)
+        # CRITICAL: Back up before writing (ring of BACKUP_SLOTS, rate-limited)
         self._create_backup()
         
         # Atomic write: write to temp file first, then rename
@@ -108,8 +246,12 @@ class KPILogger:
         temp_file = self.log_file.with_suffix('.json.tmp')
         try:
             # Write to temporary file first
-            json_str = json.dumps(data, indent=2, ensure_ascii=False)
-            temp_file.write_text(json_str, encoding='utf-8')
+            # CRITICAL: fsync before the rename, so the file that replaces kpi_logs.json is
+            # already complete on disk - no re-read/re-parse needed to trust it afterwards
+            with open(temp_file, 'wb') as f:
+                f.write(dumps_kpi(data))
+                f.flush()
+                os.fsync(f.fileno())
             
             # Atomic rename (works on most filesystems)
             temp_file.replace(self.log_file)
@@ -118,25 +260,6 @@ class KPILogger:
             if not self.log_file.exists():
                 raise IOError(f"Failed to save {self.log_file} - file does not exist after write")
             
-            # Verify file can be read back (integrity check)
-            try:
-                with open(self.log_file, 'r', encoding='utf-8') as f:
-                    json.load(f)
-            except Exception as verify_error:
-                raise IOError(f"File saved but verification failed: {verify_error}")
-            
-            # CRITICAL: Force flush to disk to ensure data is persisted immediately
-            # This prevents data loss if the process crashes right after save
-            try:
-                import os
-                file_handle = open(self.log_file, 'r+b')
-                file_handle.flush()
-                os.fsync(file_handle.fileno())  # Force write to disk
-                file_handle.close()
-            except Exception as flush_error:
-                # Flush failure is not critical, but log it
-                print(f"⚠️  Warning: Could not flush file to disk: {flush_error}")
-            
         except Exception as e:
             # If temp file exists, try to clean it up
             if temp_file.exists():
@@ -148,30 +271,37 @@ class KPILogger:
             raise IOError(f"Failed to save logs to {self.log_file}: {e}") from e
     
     def _create_backup(self):
-        """Create a backup of kpi_logs.json (keep last 5 backups)."""
+        """Copy kpi_logs.json into the next backup slot, at most once every BACKUP_INTERVAL seconds."""
         try:
             if not self.log_file.exists():
                 return  # No file to backup
             
+            now = time.monotonic()
+            if self._last_backup_time is not None and now - self._last_backup_time < BACKUP_INTERVAL:
+                return  # Recent enough - the journal covers everything since
+            
             # Create backup directory if it doesn't exist
             backup_dir = self.log_file.parent / "backups"
             backup_dir.mkdir(exist_ok=True)
             
-            # Create timestamped backup
-            timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-            backup_file = backup_dir / f"kpi_logs_{timestamp}.json"
+            if self._backup_slot is None:
+                # First backup of this run: start after the newest slot a previous run left behind
+                mtimes = []
+                for slot in range(BACKUP_SLOTS):
+                    try:
+                        mtimes.append((backup_dir / f"kpi_logs.bak{slot}.json").stat().st_mtime)
+                    except OSError:
+                        mtimes.append(-1.0)
+                self._backup_slot = max(range(BACKUP_SLOTS), key=mtimes.__getitem__)
+            
+            # Overwriting the oldest slot is the pruning - no directory scan needed
+            self._backup_slot = (self._backup_slot + 1) % BACKUP_SLOTS
+            backup_file = backup_dir / f"kpi_logs.bak{self._backup_slot}.json"
             
             # Copy current file to backup
             import shutil
             shutil.copy2(self.log_file, backup_file)
-            
-            # Keep only last 5 backups (delete older ones)
-            backups = sorted(backup_dir.glob("kpi_logs_*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
-            for old_backup in backups[5:]:  # Keep only 5 most recent
-                try:
-                    old_backup.unlink()
-                except:
-                    pass
+            self._last_backup_time = now
             
         except Exception as e:
             # Don't fail if backup creation fails - just log it
@@ -227,8 +357,9 @@ class KPILogger:
             # Also save entry_mc separately (the MCAP when alert was triggered)
             entry_mc = alert.get("entry_mc")
             
+            now = datetime.now(timezone.utc)
             alert_entry = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": now.isoformat(),
                 "level": level,
                 "token": alert.get("token"),
                 "contract": alert.get("contract"),
@@ -250,20 +381,29 @@ class KPILogger:
                 "hot_list_status": alert.get("hot_list_status"),  # Alternative field name
                 "confirmations": alert.get("confirmations"),  # Save confirmations for API
             }
-            self.alerts.append(alert_entry)
+            alert_entry["_ts_epoch"] = now.timestamp()
             
-            # CRITICAL: Save logs immediately - don't batch, ensure persistence
-            # This ensures alerts are NEVER lost, even if Railway redeploys
+            # CRITICAL: Journal the alert immediately (fsync'd) - don't batch, ensure persistence
+            # This ensures alerts are NEVER lost, even if Railway redeploys. The Git sync below
+            # only picks up kpi_logs.json, so the snapshot is then written right away as well
             max_retries = 5  # Increased retries for better reliability
             save_success = False
             save_error = None
             
             for attempt in range(max_retries):
                 try:
-                    self.save_logs()
+                    self._append_record("alert", alert_entry)
                     save_success = True
-                    print(f"✅ Alert saved to {self.log_file}: {alert.get('token')} (Tier {alert.get('tier')}, Current MC ${current_mcap_shown:,.0f})")
-                    print(f"   Total alerts in file: {len(self.alerts)}")
+                    print(f"✅ Alert journaled to {self.journal_file}: {alert.get('token')} (Tier {alert.get('tier')}, Current MC ${current_mcap_shown:,.0f})")
+                    
+                    # Git sync commits kpi_logs.json only - write the snapshot now instead of
+                    # leaving it to the background worker, or the sync would find no diff.
+                    # A failure here must not retry the (already journaled) append.
+                    try:
+                        self.flush()
+                        print(f"   Saved to {self.log_file} - total alerts in file: {len(self.alerts)}")
+                    except Exception as snapshot_error:
+                        print(f"⚠️  Snapshot write failed, alert kept in {self.journal_file}: {snapshot_error}")
                     
                     # CRITICAL: Auto-sync to Git to prevent data loss on Railway redeploy
                     # Only sync if we're using local file (not Railway volume)
@@ -372,6 +512,7 @@ class KPILogger:
                         print(f"   Alert data: token={alert.get('token')}, tier={alert.get('tier')}, contract={alert.get('contract')}")
                         
                         # EMERGENCY: Try direct write as absolute last resort
+                        self.alerts.append(alert_entry)
                         try:
                             import shutil
                             # Create emergency backup
@@ -382,10 +523,11 @@ class KPILogger:
                             
                             # Direct write - no atomic operations, just save the data
                             emergency_data = {
-                                "alerts": self.alerts,
-                                "false_positives": self.false_positives,
-                                "true_positives": self.true_positives,
+                                "alerts": [_persisted(a) for a in self.alerts],
+                                "false_positives": [_persisted(fp) for fp in self.false_positives],
+                                "true_positives": [_persisted(tp) for tp in self.true_positives],
                                 "last_updated": datetime.now(timezone.utc).isoformat(),
+                                "journal_seq": self._journal_seq,
                             }
                             json_str = json.dumps(emergency_data, indent=2, ensure_ascii=False)
                             self.log_file.write_text(json_str, encoding='utf-8')
@@ -432,6 +574,9 @@ class KPILogger:
             if not os.path.exists('.git'):
                 return  # Not a Git repo, skip sync
             
+            # Journaled records only reach Git through the kpi_logs.json snapshot
+            self.flush()
+            
             # Get the actual file path (might be in /data on Railway)
             file_to_sync = self.log_file
             
@@ -575,53 +720,68 @@ class KPILogger:
     
     def mark_false_positive(self, alert_entry: Dict, reason: str):
         """Mark an alert as false positive."""
+        now = datetime.now(timezone.utc)
         fp_entry = {
             **alert_entry,
             "fp_reason": reason,
-            "marked_at": datetime.now(timezone.utc).isoformat(),
+            "marked_at": now.isoformat(),
+            "_marked_at_epoch": now.timestamp(),
         }
-        self.false_positives.append(fp_entry)
-        self.save_logs()
+        self._append_record("fp", fp_entry)
     
     def mark_true_positive(self, alert_entry: Dict, peak_multiplier: float, time_to_peak_minutes: float):
         """Mark an alert as true positive with peak data."""
+        now = datetime.now(timezone.utc)
         tp_entry = {
             **alert_entry,
             "peak_multiplier": peak_multiplier,
             "time_to_peak_minutes": time_to_peak_minutes,
-            "marked_at": datetime.now(timezone.utc).isoformat(),
+            "marked_at": now.isoformat(),
+            "_marked_at_epoch": now.timestamp(),
         }
-        self.true_positives.append(tp_entry)
-        self.save_logs()
+        self._append_record("tp", tp_entry)
     
     def get_daily_stats(self, days: int = 1) -> Dict:
         """Get daily statistics."""
         cutoff = datetime.now(timezone.utc).timestamp() - (days * 24 * 3600)
         
-        recent_alerts = [a for a in self.alerts if datetime.fromisoformat(a["timestamp"]).timestamp() > cutoff]
-        recent_fps = [fp for fp in self.false_positives if datetime.fromisoformat(fp["marked_at"]).timestamp() > cutoff]
-        recent_tps = [tp for tp in self.true_positives if datetime.fromisoformat(tp["marked_at"]).timestamp() > cutoff]
-        
-        high_alerts = [a for a in recent_alerts if a["level"] == "HIGH"]
-        medium_alerts = [a for a in recent_alerts if a["level"] == "MEDIUM"]
+        # One pass per list, counting only - no intermediate lists of recent records.
+        # Full scans rather than stopping at the cutoff: file order isn't guaranteed chronological
+        total = high = medium = 0
+        for a in self.alerts:
+            if a["_ts_epoch"] > cutoff:
+                total += 1
+                level = a["level"]
+                if level == "HIGH":
+                    high += 1
+                elif level == "MEDIUM":
+                    medium += 1
         
         # False positive breakdown
+        fp_count = 0
         fp_causes = defaultdict(int)
-        for fp in recent_fps:
-            for tag in fp.get("tags", []):
-                if tag in ["no_ca", "low_liq", "has_sb1", "has_glydo", "tiny_buy", "weak_social"]:
-                    fp_causes[tag] += 1
+        for fp in self.false_positives:
+            if fp["_marked_at_epoch"] > cutoff:
+                fp_count += 1
+                for tag in fp.get("tags", ()):
+                    if tag in _FP_TAG_CATEGORIES:
+                        fp_causes[tag] += 1
+        
+        tp_count = 0
+        for tp in self.true_positives:
+            if tp["_marked_at_epoch"] > cutoff:
+                tp_count += 1
         
         # Precision
-        high_precision = len(recent_tps) / len(high_alerts) if high_alerts else 0.0
+        high_precision = tp_count / high if high else 0.0
         
         return {
             "period_days": days,
-            "high_alerts": len(high_alerts),
-            "medium_alerts": len(medium_alerts),
-            "total_alerts": len(recent_alerts),
-            "false_positives": len(recent_fps),
-            "true_positives": len(recent_tps),
+            "high_alerts": high,
+            "medium_alerts": medium,
+            "total_alerts": total,
+            "false_positives": fp_count,
+            "true_positives": tp_count,
             "high_precision": high_precision,
             "fp_breakdown": dict(fp_causes),
         }
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+kpi_patch.py
+
+RFC 6902 JSON Patch support for kpi_logs.json fixes:
+- snapshot_alerts()/diff_alerts() turn in-place alert edits into patch operations,
+  each alert's operations guarded by "test" operations on its contract and timestamp
+- apply_patch() replays operations on a loaded kpi_logs dict, refusing (ValueError)
+  when a test fails - e.g. the alerts were re-sorted or had alerts inserted since the diff
+- sidecar_entries()/append_sidecar()/merge_sidecar() keep fixes pending in an
+  append-only JSONL file (kpi_logs_fixes.jsonl) that readers (api_server, kpi_index)
+  merge over the base file. Each line holds one alert's operations keyed by its
+  contract + timestamp rather than its position, so re-sorting kpi_logs.json
+  between runs doesn't move fixes onto other alerts
+
+Run directly to apply kpi_logs.patch.json (or a .jsonl sidecar, which is then
+removed or cut down to the entries that didn't apply) to kpi_logs.json, with a backup.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from kpi_io import KPI_LOGS_FILE, append_jsonl, load_kpi, read_jsonl, save_kpi
+
+PATCH_FILE = Path("kpi_logs.patch.json")
+SIDECAR_FILE = Path("kpi_logs_fixes.jsonl")
+
+_MISSING = object()
+
+# Alert fields checked by "test" operations before an alert's edits, so a patch
+# recorded against one ordering of kpi_logs.json can't land on other alerts
+_GUARD_FIELDS = ("contract", "timestamp")
+
+
+def _escape(key: str) -> str:
+    # JSON Pointer escaping (RFC 6901): '~' first, then '/'
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def snapshot_alerts(alerts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Shallow copy of every alert; the fixers only set top-level fields."""
+    return [dict(alert) for alert in alerts]
+
+
+def _field_ops(old: Dict[str, Any], new: Dict[str, Any], base: str) -> List[Dict[str, Any]]:
+    """add/replace/remove operations turning one alert dict into another."""
+    ops = []
+    for key, value in new.items():
+        old_value = old.get(key, _MISSING)
+        if old_value is _MISSING:
+            ops.append({"op": "add", "path": base + _escape(key), "value": value})
+        elif old_value != value:
+            ops.append({"op": "replace", "path": base + _escape(key), "value": value})
+    for key in old.keys() - new.keys():
+        ops.append({"op": "remove", "path": base + _escape(key)})
+    return ops
+
+
+def diff_alerts(before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """JSON Patch operations turning the before snapshot into the edited alerts."""
+    ops = []
+    for idx, (old, new) in enumerate(zip(before, after)):
+        if old == new:
+            continue
+        base = f"/alerts/{idx}/"
+        for key in _GUARD_FIELDS:
+            if key in old:
+                ops.append({"op": "test", "path": base + key, "value": old[key]})
+        ops.extend(_field_ops(old, new, base))
+    return ops
+
+
+def _alert_key(alert: Dict[str, Any]) -> Tuple[Any, ...]:
+    return tuple(alert.get(key) for key in _GUARD_FIELDS)
+
+
+def sidecar_entries(before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    One sidecar entry per edited alert: its contract and timestamp before the edit,
+    plus operations with paths relative to the alert ("/current_mcap").
+    """
+    entries = []
+    for old, new in zip(before, after):
+        if old != new:
+            entry = {key: old.get(key) for key in _GUARD_FIELDS}
+            entry["ops"] = _field_ops(old, new, "/")
+            entries.append(entry)
+    return entries
+
+
+def apply_patch(data: Dict[str, Any], ops: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply add/replace/remove/test operations to data in place and return it.
+    
+    A failed test (or a path that no longer exists) raises and stops the patch;
+    data may then be partly patched, so callers should discard it rather than save.
+    """
+    for op in ops:
+        *parents, last = [_unescape(t) for t in op["path"].lstrip('/').split('/')]
+        target = data
+        for token in parents:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        kind = op["op"]
+        if isinstance(target, list):
+            last = len(target) if kind == "add" and last == '-' else int(last)
+        if kind == "test":
+            try:
+                actual = target[last]
+            except (KeyError, IndexError):
+                actual = _MISSING
+            if actual != op["value"]:
+                raise ValueError(f"JSON Patch test failed at {op['path']}: expected {op['value']!r}, "
+                                 f"found {'nothing' if actual is _MISSING else repr(actual)}")
+        elif kind == "add":
+            if isinstance(target, list):
+                target.insert(last, op["value"])
+            else:
+                target[last] = op["value"]
+        elif kind == "replace":
+            if not isinstance(target, list) and last not in target:
+                raise KeyError(f"replace target missing: {op['path']}")
+            target[last] = op["value"]
+        elif kind == "remove":
+            del target[last]
+        else:
+            raise ValueError(f"Unsupported JSON Patch op: {kind}")
+    return data
+
+
+def append_sidecar(entries: List[Dict[str, Any]], path: str | os.PathLike = SIDECAR_FILE) -> None:
+    """Append sidecar_entries() to the JSONL sidecar, one per line, in a single write."""
+    append_jsonl(entries, path)
+
+
+def load_sidecar(path: str | os.PathLike = SIDECAR_FILE) -> List[Dict[str, Any]]:
+    """Entries recorded in the sidecar, oldest first (empty if there is none)."""
+    return read_jsonl(path)
+
+
+def apply_sidecar(data: Dict[str, Any], entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Apply sidecar entries to the alerts they were recorded for, in order.
+    
+    Returns the entries that could not be applied: no alert (or more than one)
+    has their contract + timestamp, or their operations no longer fit it.
+    Those alerts are left as they were.
+    """
+    alerts = data.get("alerts", [])
+    positions: Dict[Tuple[Any, ...], List[int]] = {}
+    for idx, alert in enumerate(alerts):
+        positions.setdefault(_alert_key(alert), []).append(idx)
+    
+    unapplied = []
+    for entry in entries:
+        key = _alert_key(entry)
+        matches = positions.get(key, ())
+        if len(matches) != 1:
+            unapplied.append(entry)
+            continue
+        idx = matches[0]
+        try:
+            # Patch a copy so a failing entry leaves the alert untouched
+            patched = apply_patch(dict(alerts[idx]), entry["ops"])
+        except (KeyError, IndexError, ValueError):
+            unapplied.append(entry)
+            continue
+        alerts[idx] = patched
+        new_key = _alert_key(patched)
+        if new_key != key:
+            # Later entries were recorded against the edited contract/timestamp
+            del positions[key]
+            positions.setdefault(new_key, []).append(idx)
+    return unapplied
+
+
+def merge_sidecar(data: Dict[str, Any], path: str | os.PathLike = SIDECAR_FILE) -> Dict[str, Any]:
+    """Apply pending sidecar entries over a freshly loaded kpi_logs dict and return it."""
+    apply_sidecar(data, load_sidecar(path))
+    return data
+
+
+def main():
+    patch_file = Path(sys.argv[1]) if len(sys.argv) > 1 else PATCH_FILE
+    if not patch_file.exists():
+        print(f"❌ {patch_file} not found!")
+        return
+
+    data = load_kpi(KPI_LOGS_FILE)
+    if patch_file.suffix == '.jsonl':
+        merge_sidecar_file(data, patch_file)
+        return
+
+    ops = load_kpi(patch_file)
+    try:
+        apply_patch(data, ops)
+    except (KeyError, IndexError, ValueError) as e:
+        # Stale patch: kpi_logs.json changed since it was recorded - don't save anything
+        print(f"❌ {patch_file} no longer matches {KPI_LOGS_FILE} ({e}); {KPI_LOGS_FILE} left unchanged")
+        return
+
+    backup_path = KPI_LOGS_FILE.with_suffix('.json.backup_patch')
+    save_kpi(data, KPI_LOGS_FILE, backup=backup_path)
+    print(f"📦 Backup created: {backup_path}")
+    print(f"✅ Applied {len(ops)} operation(s) from {patch_file} to {KPI_LOGS_FILE}")
+
+
+def merge_sidecar_file(data: Dict[str, Any], sidecar_file: Path):
+    """Fold a sidecar into kpi_logs.json, keeping only the entries that didn't apply."""
+    entries = load_sidecar(sidecar_file)
+    unapplied = apply_sidecar(data, entries)
+    applied = len(entries) - len(unapplied)
+    if applied:
+        backup_path = KPI_LOGS_FILE.with_suffix('.json.backup_patch')
+        save_kpi(data, KPI_LOGS_FILE, backup=backup_path)
+        print(f"📦 Backup created: {backup_path}")
+    print(f"✅ Applied {applied}/{len(entries)} alert fix(es) from {sidecar_file} to {KPI_LOGS_FILE}")
+
+    # Applied entries are in the base file now; replaying them later would re-apply them
+    if unapplied:
+        tmp_path = sidecar_file.with_name(sidecar_file.name + '.tmp')
+        tmp_path.unlink(missing_ok=True)
+        append_jsonl(unapplied, tmp_path)
+        os.replace(tmp_path, sidecar_file)
+        print(f"⚠️ Kept {len(unapplied)} entries in {sidecar_file}: no single alert matches them or they no longer apply")
+    else:
+        sidecar_file.unlink()
+        print(f"🧹 Removed merged sidecar {sidecar_file}")
+
+
+if __name__ == "__main__":
+    # Fix Windows console encoding
+    if sys.platform == 'win32':
+        try:
+            sys.stdout.reconfigure(encoding='utf-8')
+        except:
+            pass
+    main()
@@ -29,7 +29,7 @@ if os.getenv('RAILWAY_ENVIRONMENT') == 'build' or os.getenv('CI') or os.getenv('
 from message_parser import MessageParser
 from live_monitor_core import LiveMemecoinMonitor, parse_callers_subs
 from live_alert_formatter import format_alert
-from dexscreener_fetcher import enrich_alert_with_live_data
+from dexscreener_fetcher import enrich_alerts_bulk
 from kpi_logger import KPILogger
 import re
 
@@ -478,6 +478,15 @@ class TelegramMonitorNew:
                         if updated:
                             print(f"[{source.upper():<15}] ✅ Updated existing alerts for {parsed.symbol}: callers={callers}, subs={subs}")
         
+        # Enrich with live MCAP/symbol from DexScreener if enabled: one batched
+        # request (up to 30 contracts) for the whole group instead of one per alert
+        if self.enrich_with_live_mcap:
+            try:
+                enrich_alerts_bulk([alert for alert in alerts if alert.get("contract")])
+            except Exception as e:
+                # Don't fail alerts if DexScreener API fails
+                print(f"[DexScreener] Warning: Could not enrich alerts: {e}")
+        
         for alert in alerts:
             # CRITICAL FIX: Save ALL alerts to kpi_logs.json FIRST, before any filters
             # This ensures the API has complete data, even if alerts are filtered for Telegram sending
@@ -491,20 +500,19 @@ class TelegramMonitorNew:
             debug_log({"sessionId":"debug-session","runId":"run1","hypothesisId":"H2,H7,H10","location":"telegram_monitor_new.py:343","message":"Alert before processing","data":{"token":token,"tier":tier,"alert_key":str(alert_key),"alert_id":alert.get("alert_id"),"alert_keys":list(alert.keys())},"timestamp":int(current_time*1000)})
             # #endregion
             
-            # Enrich with live MCAP/symbol from DexScreener if enabled
+            # Apply the live MCAP/symbol fetched above
             current_mcap = None
             if self.enrich_with_live_mcap and alert.get("contract"):
                 try:
-                    enriched = enrich_alert_with_live_data(alert)
                     # Update alert with live data if available
-                    if enriched.get("live_mcap") is not None:
-                        current_mcap = enriched["live_mcap"]
+                    if alert.get("live_mcap") is not None:
+                        current_mcap = alert["live_mcap"]
                         alert["mc_usd"] = current_mcap
                         alert["mc_source"] = "dexscreener_live"
                         print(f"[DexScreener] Updated MCAP for {alert.get('token')}: ${current_mcap:,.2f}")
-                    if enriched.get("live_symbol") and (not alert.get("token") or alert.get("token") == "UNKNOWN"):
-                        alert["token"] = enriched["live_symbol"]
-                        print(f"[DexScreener] Updated symbol: {enriched['live_symbol']}")
+                    if alert.get("live_symbol") and (not alert.get("token") or alert.get("token") == "UNKNOWN"):
+                        alert["token"] = alert["live_symbol"]
+                        print(f"[DexScreener] Updated symbol: {alert['live_symbol']}")
                     
                     # Update local token variable and alert_key after enrichment
                     if alert.get("token") and alert.get("token") != token:
@@ -512,8 +520,8 @@ class TelegramMonitorNew:
                         alert_key = (token, tier)
                         print(f"🔄 Token updated to: {token}")
                         
-                    if enriched.get("live_liquidity") is not None:
-                        alert["liq_usd"] = enriched["live_liquidity"]
+                    if alert.get("live_liquidity") is not None:
+                        alert["liq_usd"] = alert["live_liquidity"]
                 except Exception as e:
                     # Don't fail alerts if DexScreener API fails
                     print(f"[DexScreener] Warning: Could not enrich alert: {e}")